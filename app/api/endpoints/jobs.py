@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.database import get_db
+from app.api.models.job import PublicationJob
+from app.api.schemas.job import PublicationJob as PublicationJobSchema, PublicationJobList
+from app.workers.scheduler import publication_scheduler, cancel_publication
+
+router = APIRouter()
+
+@router.get("/", response_model=PublicationJobList)
+def get_jobs(
+    status: Optional[str] = None,
+    target_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Get publication jobs, newest first, optionally filtered by status and target."""
+    query = db.query(PublicationJob)
+    if status:
+        query = query.filter(PublicationJob.status == status)
+    if target_id:
+        query = query.filter(PublicationJob.target_id == target_id)
+    jobs = query.order_by(PublicationJob.created_at.desc()).offset(skip).limit(limit).all()
+    return {"jobs": jobs}
+
+@router.get("/scheduler")
+def get_scheduler_stats():
+    """Get the scheduler heap size and the next due time."""
+    return publication_scheduler.stats()
+
+@router.get("/{job_id}", response_model=PublicationJobSchema)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """Get a publication job by ID."""
+    job = db.query(PublicationJob).filter(PublicationJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/{job_id}", response_model=PublicationJobSchema)
+def cancel_job(job_id: str, db: Session = Depends(get_db)):
+    """Cancel a scheduled publication job."""
+    job = db.query(PublicationJob).filter(PublicationJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if not cancel_publication(db, job):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, only scheduled jobs can be cancelled")
+    return job
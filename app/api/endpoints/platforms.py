@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from app.utils.rate_limiter import limiter_stats
+from app.utils.resilience import breaker_stats
+from app.workers.executor import executor_stats
+
+router = APIRouter()
+
+@router.get("/executors")
+def get_executor_stats():
+    """Get counters of the thread pools running platform SDK calls."""
+    return executor_stats()
+
+@router.get("/limits")
+def get_limiter_stats():
+    """Get counters of the outbound rate limiters per platform account."""
+    return limiter_stats()
+
+@router.get("/circuits")
+def get_breaker_stats():
+    """Get the circuit breaker state per platform ("closed", "open" or "half_open")."""
+    return breaker_stats()
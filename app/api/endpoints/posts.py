@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone
+import asyncio
+import logging
 import os
 import json
 
@@ -9,9 +12,22 @@ from app.db.database import get_db
 from app.api.models.post import Post, PublicationLog
 from app.api.schemas.post import PostCreate, Post as PostSchema, PostList
 from app.config.settings import MEDIA_DIR, MEDIA_STRUCTURE
+from app.api.schemas.job import PublicationJob as PublicationJobSchema, PublicationJobList, PublicationSchedule
+from app.workers.prefetch import prefetch_post_media, ensure_post_media
+from app.workers.queue import enqueue_publication, run_publisher
+from app.workers.scheduler import schedule_publication
+from app.workers.checkpoints import clear_checkpoints
+from app.utils.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+PLATFORMS = ["vk", "telegram", "instagram"]
+
+# Platforms whose publishers upload local files (Telegram reuses file_ids)
+UPLOADING_PLATFORMS = ["vk", "instagram"]
+
 def generate_post_name(text: str, max_length: int = 50) -> str:
     """Generate a post name from the first words of the text."""
     words = text.split()
@@ -34,7 +50,7 @@ def create_storage_path(post_name: str) -> str:
     return path
 
 @router.post("/", response_model=PostSchema, status_code=status.HTTP_201_CREATED)
-def create_post(post_data: PostCreate, db: Session = Depends(get_db)):
+def create_post(post_data: PostCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Create a new post."""
     # Generate post name from text
     post_name = generate_post_name(post_data.text)
@@ -72,6 +88,10 @@ def create_post(post_data: PostCreate, db: Session = Depends(get_db)):
             "videos": videos
         }, f, ensure_ascii=False, indent=2)
 
+    # Download media in the background so publishing is upload-only
+    if photos or videos:
+        background_tasks.add_task(prefetch_post_media, db_post.id)
+
     return db_post
 
 @router.get("/", response_model=PostList)
@@ -218,6 +238,7 @@ def delete_post(post_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Post not found")
 
     # Delete post from database
+    clear_checkpoints(db, post.id)
     db.delete(post)
     db.commit()
 
@@ -230,7 +251,7 @@ def delete_post(post_id: str, db: Session = Depends(get_db)):
     return None
 
 @router.post("/{post_id}", response_model=PostSchema)
-async def update_post(post_id: str, data: dict, db: Session = Depends(get_db)):
+async def update_post(post_id: str, data: dict, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Update a post."""
     # Проверяем, что это запрос на обновление
     if data.get("_method") != "update":
@@ -258,6 +279,10 @@ async def update_post(post_id: str, data: dict, db: Session = Depends(get_db)):
     if "videos" in data:
         post.videos = data["videos"]
 
+    # Шаги прошлых попыток публикации относятся к старому содержимому
+    if "text" in data or "photos" in data or "videos" in data:
+        clear_checkpoints(db, post.id)
+
     # Обновляем время изменения
     post.updated_at = datetime.now(timezone.utc)
 
@@ -273,6 +298,10 @@ async def update_post(post_id: str, data: dict, db: Session = Depends(get_db)):
             "videos": post.videos
         }, f, ensure_ascii=False, indent=2)
 
+    # Refresh prefetched media if the set of files changed
+    if "photos" in data or "videos" in data:
+        background_tasks.add_task(prefetch_post_media, post.id)
+
     return post
 
 @router.post("/{post_id}/publish/{platform}", response_model=PostSchema)
@@ -282,21 +311,13 @@ async def publish_post(post_id: str, platform: str, db: Session = Depends(get_db
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if platform not in ["vk", "telegram", "instagram"]:
+    if platform not in PLATFORMS:
         raise HTTPException(status_code=400, detail="Invalid platform")
 
     # Call the appropriate worker to publish the post
     success = False
     try:
-        if platform == "vk":
-            from app.workers.vk.publisher import publish_post_to_vk
-            success = await publish_post_to_vk(post_id)
-        elif platform == "telegram":
-            from app.workers.telegram.publisher import publish_post_to_telegram
-            success = await publish_post_to_telegram(post_id)
-        elif platform == "instagram":
-            from app.workers.instagram.publisher import publish_post_to_instagram
-            success = await publish_post_to_instagram(post_id)
+        success = await run_publisher("post", post_id, platform)
 
         if not success:
             # If the worker failed, add an error log
@@ -310,6 +331,9 @@ async def publish_post(post_id: str, platform: str, db: Session = Depends(get_db
             db.commit()
 
             raise HTTPException(status_code=500, detail=f"Failed to publish to {platform}")
+    except CircuitOpenError as e:
+        # The platform is down, nothing was attempted
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_in) + 1)})
     except Exception as e:
         # If an exception occurred, add an error log
         log = PublicationLog(
@@ -326,3 +350,87 @@ async def publish_post(post_id: str, platform: str, db: Session = Depends(get_db
     # Refresh the post to get the updated status
     db.refresh(post)
     return post
+
+@router.post("/{post_id}/publish/{platform}/queue", response_model=PublicationJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def queue_publish_post(post_id: str, platform: str, db: Session = Depends(get_db)):
+    """Queue a post for publishing to a specific platform and return the job."""
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    if platform not in PLATFORMS:
+        raise HTTPException(status_code=400, detail="Invalid platform")
+
+    return enqueue_publication(db, "post", post_id, platform)
+
+async def iter_publish_results(post_id: str, platforms: List[str]):
+    """Publish a post to several platforms concurrently, yielding NDJSON lines as each finishes."""
+    if any(platform in UPLOADING_PLATFORMS for platform in platforms):
+        # Download media once up front so the publishers share the same files
+        await ensure_post_media(post_id)
+
+    async def publish(platform):
+        try:
+            success = await run_publisher("post", post_id, platform)
+            error = None if success else f"Failed to publish to {platform}"
+        except Exception as e:
+            logger.error(f"Error publishing post {post_id} to {platform}: {str(e)}")
+            success, error = False, str(e)
+        return {"platform": platform, "success": bool(success), "error": error}
+
+    # Tasks keep running if the client disconnects, so every platform gets published
+    tasks = [asyncio.create_task(publish(platform)) for platform in platforms]
+    for task in asyncio.as_completed(tasks):
+        result = await task
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+@router.post("/{post_id}/publish-all")
+async def publish_post_to_all(post_id: str, db: Session = Depends(get_db)):
+    """Publish a post to all platforms it is not yet published on.
+
+    Platforms are published concurrently and the response streams one JSON
+    line per platform ({"platform", "success", "error"}) as it completes.
+    """
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    platforms = [platform for platform in PLATFORMS if not getattr(post, f"is_published_{platform}")]
+
+    return StreamingResponse(
+        iter_publish_results(post_id, platforms),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}  # Let nginx pass each line through immediately
+    )
+
+@router.post("/{post_id}/schedule", response_model=PublicationJobList, status_code=status.HTTP_201_CREATED)
+async def schedule_post(
+    post_id: str,
+    schedule: PublicationSchedule,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Schedule a post for publishing at a given time.
+
+    Scheduling the same post and platform again moves the existing job.
+    """
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    platforms = schedule.platforms or [
+        platform for platform in PLATFORMS if not getattr(post, f"is_published_{platform}")
+    ]
+    if any(platform not in PLATFORMS for platform in platforms):
+        raise HTTPException(status_code=400, detail="Invalid platform")
+
+    jobs = [
+        schedule_publication(db, "post", post_id, platform, schedule.publish_at)
+        for platform in platforms
+    ]
+
+    # Have the media ready well before the slot
+    if post.photos or post.videos:
+        background_tasks.add_task(prefetch_post_media, post_id)
+
+    return {"jobs": jobs}
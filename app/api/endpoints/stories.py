@@ -1,21 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone
+import asyncio
+import json
+import logging
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.api.models.post import Post
-from app.api.models.story import Story, StoryPublicationLog
-from app.api.schemas.story import StoryCreate, Story as StorySchema, StoryList
+from app.api.models.story import Story, StoryPublicationLog, generate_story_id
+from app.api.schemas.story import StoryBatchCreate, StoryCreate, Story as StorySchema, StoryList
+from app.api.schemas.job import PublicationJob as PublicationJobSchema
 from app.utils.text_extractor import extract_model_and_price
+from app.utils.resilience import CircuitOpenError
+from app.utils.story_renderer import story_renderer
+from app.workers.queue import enqueue_publication, run_publisher
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+PLATFORMS = ["vk", "telegram", "instagram"]
+
+# Most (post, platform) pairs one batch request may create
+BATCH_MAX_STORIES = 150
+
 @router.post("/{post_id}/platform/{platform}", response_model=StorySchema, status_code=status.HTTP_201_CREATED)
 def create_story(post_id: str, platform: str, db: Session = Depends(get_db)):
     """Create a new story for a post."""
     # Check if platform is valid
-    if platform not in ["vk", "telegram", "instagram"]:
+    if platform not in PLATFORMS:
         raise HTTPException(status_code=400, detail="Invalid platform")
     
     # Get post from database
@@ -67,12 +82,138 @@ def create_story(post_id: str, platform: str, db: Session = Depends(get_db)):
     
     return db_story
 
+async def iter_batch_results(items: List[dict]):
+    """Render and queue batch stories concurrently, yielding NDJSON lines as each finishes."""
+    async def process(item):
+        result = {
+            "post_id": item["post_id"],
+            "platform": item["platform"],
+            "story_id": item.get("story_id"),
+            "created": item.get("created", False),
+            "status": "error",
+            "job_id": None,
+            "error": item.get("error"),
+        }
+        if result["error"]:
+            return result
+        if item["is_published"]:
+            result["status"] = "published"
+            return result
+        if not item["media_file_id"]:
+            result["error"] = "Post has no photos"
+            return result
+
+        try:
+            # Render up front (in the render pool, in parallel); the publisher
+            # then reads the image from the story cache
+            image = await story_renderer.render(item["media_file_id"], item["model_name"], item["price"], item["platform"])
+            if image is None:
+                result["error"] = "Failed to render story image"
+                return result
+
+            db = SessionLocal()
+            try:
+                job = enqueue_publication(db, "story", item["story_id"], item["platform"])
+                result["status"], result["job_id"] = job.status, job.id
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Error preparing story {item['story_id']} for {item['platform']}: {str(e)}")
+            result["error"] = str(e)
+        return result
+
+    # Tasks keep running if the client disconnects, so every story gets queued
+    tasks = [asyncio.create_task(process(item)) for item in items]
+    for task in asyncio.as_completed(tasks):
+        result = await task
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+@router.post("/batch")
+async def create_stories_batch(batch: StoryBatchCreate, db: Session = Depends(get_db)):
+    """Create, render and queue stories for many posts and platforms at once.
+
+    Missing stories are inserted in one transaction, existing ones are
+    reused. The response streams one JSON line per (post, platform) pair
+    ({"post_id", "platform", "story_id", "created", "status", "job_id",
+    "error"}) as its image is rendered and its publication queued. status
+    is the job status, "published" for stories already published, or
+    "error".
+    """
+    platforms = list(dict.fromkeys(batch.platforms or PLATFORMS))
+    invalid = [platform for platform in platforms if platform not in PLATFORMS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid platforms: {', '.join(invalid)}")
+
+    post_ids = list(dict.fromkeys(batch.post_ids))
+    if not post_ids:
+        raise HTTPException(status_code=400, detail="No posts given")
+    if len(post_ids) * len(platforms) > BATCH_MAX_STORIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_STORIES} stories per batch")
+
+    posts = {post.id: post for post in db.query(Post).filter(Post.id.in_(post_ids)).all()}
+    existing = {
+        (story.post_id, story.platform): story
+        for story in db.query(Story).filter(Story.post_id.in_(list(posts)), Story.platform.in_(platforms)).all()
+    }
+
+    # Items are plain dicts, the streaming response outlives this session
+    items = []
+    new_stories = []
+    for post_id in post_ids:
+        post = posts.get(post_id)
+        if post is None:
+            items.extend({"post_id": post_id, "platform": platform, "error": "Post not found"} for platform in platforms)
+            continue
+
+        model_name, price = extract_model_and_price(post.text)
+        media_file_id = post.photos[0] if post.photos else None
+        for platform in platforms:
+            story = existing.get((post_id, platform))
+            created = story is None
+            if created:
+                story = Story(
+                    id=generate_story_id(),
+                    post_id=post_id,
+                    platform=platform,
+                    model_name=model_name,
+                    price=price,
+                    media_file_id=media_file_id,
+                    is_published=False
+                )
+                new_stories.append(story)
+            items.append({
+                "post_id": post_id,
+                "platform": platform,
+                "story_id": story.id,
+                "created": created,
+                "model_name": story.model_name,
+                "price": story.price,
+                "media_file_id": story.media_file_id,
+                "is_published": bool(story.is_published),
+            })
+
+    if new_stories:
+        db.add_all(new_stories)
+        db.commit()
+        logger.info(f"Created {len(new_stories)} stories for {len(posts)} posts")
+
+    return StreamingResponse(
+        iter_batch_results(items),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}  # Let nginx pass each line through immediately
+    )
+
 @router.get("/", response_model=StoryList)
 def get_stories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all stories."""
     stories = db.query(Story).offset(skip).limit(limit).all()
     return {"stories": stories}
 
+@router.get("/cache/stats")
+def get_story_cache_stats():
+    """Get story render cache counters."""
+    return story_renderer.stats()
+
 @router.get("/{story_id}", response_model=StorySchema)
 def get_story(story_id: str, db: Session = Depends(get_db)):
     """Get a specific story by ID."""
@@ -95,16 +236,8 @@ async def publish_story(story_id: str, db: Session = Depends(get_db)):
     # Call the appropriate worker to publish the story
     success = False
     try:
-        if story.platform == "vk":
-            from app.workers.vk.story_publisher import publish_story_to_vk
-            success = await publish_story_to_vk(story_id)
-        elif story.platform == "telegram":
-            from app.workers.telegram.story_publisher import publish_story_to_telegram
-            success = await publish_story_to_telegram(story_id)
-        elif story.platform == "instagram":
-            from app.workers.instagram.story_publisher import publish_story_to_instagram
-            success = await publish_story_to_instagram(story_id)
-        
+        success = await run_publisher("story", story_id, story.platform)
+
         if not success:
             # If the worker failed, add an error log
             log = StoryPublicationLog(
@@ -116,6 +249,9 @@ async def publish_story(story_id: str, db: Session = Depends(get_db)):
             db.commit()
             
             raise HTTPException(status_code=500, detail=f"Failed to publish story to {story.platform}")
+    except CircuitOpenError as e:
+        # The platform is down, nothing was attempted
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_in) + 1)})
     except Exception as e:
         # If an exception occurred, add an error log
         log = StoryPublicationLog(
@@ -131,3 +267,12 @@ async def publish_story(story_id: str, db: Session = Depends(get_db)):
     # Refresh the story to get the updated status
     db.refresh(story)
     return story
+
+@router.post("/{story_id}/publish/queue", response_model=PublicationJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def queue_publish_story(story_id: str, db: Session = Depends(get_db)):
+    """Queue a story for publishing and return the job."""
+    story = db.query(Story).filter(Story.id == story_id).first()
+    if story is None:
+        raise HTTPException(status_code=404, detail="Story not found")
+
+    return enqueue_publication(db, "story", story_id, story.platform)
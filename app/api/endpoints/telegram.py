@@ -1,129 +1,220 @@
-from fastapi import APIRouter, HTTPException, Response
-from aiogram import Bot
-import aiohttp
-import io
+import asyncio
+import logging
+import os
+import re
+from typing import Optional, Tuple
 
-from app.config.settings import TELEGRAM_BOT_TOKEN
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-router = APIRouter()
+from app.utils.file_resolver import file_resolver
+from app.utils.media_cache import media_cache, CHUNK_SIZE
+from app.utils.telegram_bot import get_http_session
 
-@router.get("/file/{file_id}")
-async def get_telegram_file(file_id: str):
-    """Get a file from Telegram by file_id."""
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
 
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+}
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def get_content_type(file_path) -> str:
+    """Determine content type by file extension."""
+    extension = os.path.splitext(str(file_path))[1].lower()
+    return CONTENT_TYPES.get(extension, "application/octet-stream")
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range "Range: bytes=start-end" header.
+
+    Returns an inclusive (start, end) pair, None if the header is absent or
+    should be ignored, and raises HTTPException 416 if it cannot be satisfied.
+    """
+    if not range_header:
+        return None
+
+    match = RANGE_RE.match(range_header.strip())
+    if not match:
+        # Multiple or malformed ranges: serve the whole file
+        return None
+
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        # Suffix range: the last N bytes
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+async def iter_file(path, start: int, length: int):
+    """Yield a byte range of a local file in chunks, reading in a worker thread."""
+    f = await asyncio.to_thread(open, path, "rb")
     try:
-        # Get file info
-        try:
-            file_info = await bot.get_file(file_id)
-            file_path = file_info.file_path
-        except Exception as e:
-            # Log the error
-            print(f"Error getting file info from Telegram: {str(e)}")
-
-            # Try to handle common file types based on file_id format
-            # This is a fallback for when Telegram API doesn't return file info
-            if "AgAC" in file_id:  # Photo file_id usually starts with AgAC
-                # For photos, we'll create a dummy file path
-                file_path = "photos/photo.jpg"
-            elif "BAAC" in file_id:  # Video file_id usually starts with BAAC
-                # For videos, we'll create a dummy file path
-                file_path = "videos/video.mp4"
-            else:
-                # If we can't determine the file type, raise an exception
-                raise HTTPException(status_code=400, detail=f"Unsupported file type or invalid file_id: {file_id}")
-
-        # Get file URL
-        file_url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
-
-        # Download file with SSL verification disabled
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Create a custom SSL context that doesn't verify certificates
-                import ssl
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-
-                async with session.get(file_url, ssl=ssl_context) as response:
-                    if response.status == 200:
-                        content = await response.read()
-
-                        # Determine content type
-                        content_type = "application/octet-stream"
-                        if file_path.endswith(".jpg") or file_path.endswith(".jpeg"):
-                            content_type = "image/jpeg"
-                        elif file_path.endswith(".png"):
-                            content_type = "image/png"
-                        elif file_path.endswith(".mp4"):
-                            content_type = "video/mp4"
-                        elif file_path.endswith(".mov"):
-                            content_type = "video/quicktime"
-
-                        return Response(content=content, media_type=content_type)
-                    else:
-                        # Log the error
-                        print(f"Failed to download file from Telegram: {response.status} - {await response.text()}")
-                        raise HTTPException(status_code=response.status, detail="Failed to download file from Telegram")
-            except Exception as e:
-                # Log the error
-                print(f"Error downloading file from Telegram: {str(e)}")
-
-                # Try alternative method using curl
-                try:
-                    import tempfile
-                    import os
-                    import subprocess
-
-                    # Create a temporary file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".bin") as temp_file:
-                        temp_path = temp_file.name
-
-                    # Use curl to download the file (curl handles SSL issues better)
-                    curl_cmd = [
-                        "curl",
-                        "-s",
-                        "-k",  # Skip SSL verification
-                        file_url,
-                        "-o", temp_path
-                    ]
-
-                    process = subprocess.run(curl_cmd, capture_output=True)
-
-                    if process.returncode == 0:
-                        # Read the file
-                        with open(temp_path, "rb") as f:
-                            content = f.read()
-
-                        # Clean up
-                        os.unlink(temp_path)
-
-                        # Determine content type
-                        content_type = "application/octet-stream"
-                        if file_path.endswith(".jpg") or file_path.endswith(".jpeg"):
-                            content_type = "image/jpeg"
-                        elif file_path.endswith(".png"):
-                            content_type = "image/png"
-                        elif file_path.endswith(".mp4"):
-                            content_type = "video/mp4"
-                        elif file_path.endswith(".mov"):
-                            content_type = "video/quicktime"
-
-                        return Response(content=content, media_type=content_type)
-                    else:
-                        # Log the error
-                        print(f"Curl failed with return code {process.returncode}: {process.stderr.decode()}")
-                        raise HTTPException(status_code=500, detail=f"Curl failed to download file: {process.stderr.decode()}")
-                except Exception as curl_e:
-                    # Log the error
-                    print(f"Error using curl fallback: {str(curl_e)}")
-                    raise HTTPException(status_code=500, detail=f"Error downloading file: {str(e)} (Curl fallback failed: {str(curl_e)})")
-    except HTTPException as he:
-        # Re-raise HTTP exceptions
-        raise he
-    except Exception as e:
-        # Log the error
-        print(f"Unexpected error getting file: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting file: {str(e)}")
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
     finally:
-        await bot.session.close()
+        f.close()
+
+def file_response(request: Request, path) -> Response:
+    """Stream a cached file honoring Range and If-None-Match."""
+    size = os.path.getsize(path)
+    etag = f'"{path.stem}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=86400",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file(path, 0, size), media_type=get_content_type(path), headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file(path, start, end - start + 1),
+        status_code=206,
+        media_type=get_content_type(path),
+        headers=headers
+    )
+
+async def proxy_response(request: Request, file_id: str, key: str, file_path: str) -> Optional[Response]:
+    """Stream a file straight from Telegram, filling the cache on the way.
+
+    Range requests are forwarded upstream and not cached. Returns None if
+    Telegram could not be reached so the caller can fall back.
+    """
+    range_header = request.headers.get("range")
+    upstream_headers = {"Range": range_header} if range_header else {}
+
+    session = await get_http_session()
+    try:
+        response = await session.get(
+            media_cache.file_url(file_path),
+            headers=upstream_headers,
+            ssl=media_cache.ssl_context()
+        )
+    except Exception as e:
+        logger.error(f"Error connecting to Telegram file server: {str(e)}")
+        return None
+
+    if response.status not in (200, 206):
+        logger.error(f"Failed to download file from Telegram: {response.status}")
+        if response.status == 404:
+            # The cached file_path may have expired
+            file_resolver.invalidate(file_id)
+        response.release()
+        return None
+
+    # Only complete downloads are written to the cache
+    tmp_path = media_cache.part_path(key, file_path) if response.status == 200 else None
+
+    async def body():
+        # File writes go to a worker thread, the event loop is shared with the bot and the workers
+        tmp_file = await asyncio.to_thread(open, tmp_path, "wb") if tmp_path else None
+        completed = False
+        try:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if tmp_file:
+                    await asyncio.to_thread(tmp_file.write, chunk)
+                yield chunk
+            completed = True
+        finally:
+            response.release()
+            if tmp_file:
+                tmp_file.close()
+                if completed and media_cache.lookup(key) is None:
+                    await media_cache.store(key, tmp_path)
+                    media_cache.misses += 1
+                elif tmp_path.exists():
+                    tmp_path.unlink()
+
+    headers = {"ETag": f'"{key}"', "Accept-Ranges": "bytes"}
+    for name in ("Content-Length", "Content-Range"):
+        if name in response.headers:
+            headers[name] = response.headers[name]
+
+    return StreamingResponse(
+        body(),
+        status_code=response.status,
+        media_type=get_content_type(file_path),
+        headers=headers
+    )
+
+@router.get("/file/{file_id}")
+async def get_telegram_file(file_id: str, request: Request):
+    """Get a file from Telegram by file_id.
+
+    The file is streamed from the local media cache when present, otherwise
+    straight from Telegram, so memory use does not depend on file size.
+    """
+    path = media_cache.cached_path(file_id)
+    if path is None:
+        resolved = await media_cache.resolve(file_id)
+        if resolved is None:
+            raise HTTPException(status_code=502, detail=f"Failed to get file info from Telegram: {file_id}")
+
+        key, file_path = resolved
+        path = media_cache.lookup(key)
+        if path is None:
+            if etag_matches(request.headers.get("if-none-match"), f'"{key}"'):
+                return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+            response = await proxy_response(request, file_id, key, file_path)
+            if response is not None:
+                return response
+
+            # Fall back to a regular cached download (with curl as a last resort)
+            path = await media_cache.get_path(file_id)
+            if path is None:
+                raise HTTPException(status_code=502, detail=f"Failed to download file from Telegram: {file_id}")
+        else:
+            media_cache.hits += 1
+    else:
+        media_cache.hits += 1
+
+    return file_response(request, path)
+
+@router.get("/cache/stats")
+def get_media_cache_stats():
+    """Get shared media cache and file_path resolver counters."""
+    return {
+        **media_cache.stats(),
+        "resolver": file_resolver.stats(),
+    }
@@ -1,17 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.endpoints import posts, telegram, stories
+from app.api.endpoints import posts, telegram, stories, platforms, jobs
 from app.db.database import engine, Base
+from app.utils.telegram_bot import close_bot
+from app.workers.executor import shutdown_executors
+from app.workers.queue import publication_workers
+from app.workers.render_pool import render_pool
+from app.workers.scheduler import publication_scheduler
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the publication workers on startup and close shared clients on shutdown."""
+    await publication_workers.start()
+    await publication_scheduler.start()
+    yield
+    await publication_scheduler.stop()
+    await publication_workers.stop()
+    await close_bot()
+    shutdown_executors()
+    render_pool.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title="Social Media Poster API",
     description="API for managing social media posts",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,6 +47,8 @@ app.add_middleware(
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
 app.include_router(telegram.router, prefix="/api/telegram", tags=["telegram"])
 app.include_router(stories.router, prefix="/api/stories", tags=["stories"])
+app.include_router(platforms.router, prefix="/api/platforms", tags=["platforms"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+
+from app.db.database import Base
+
+class PublicationCheckpoint(Base):
+    __tablename__ = "publication_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("post_id", "platform", "step", "item", name="uq_publication_checkpoint"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    post_id = Column(String, nullable=False, index=True)
+    platform = Column(String, nullable=False)  # "vk", "telegram", "instagram"
+    step = Column(String, nullable=False)  # e.g. "attachment", "wall_post", "upload", "media", "messages"
+    item = Column(String, nullable=False, default="")  # Media file_id or batch number, "" for post-level steps
+    value = Column(JSON, nullable=True)  # Result of the step: attachment string, upload ids, message ids
+    created_at = Column(DateTime, default=datetime.utcnow)
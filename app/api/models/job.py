@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+import uuid
+
+from app.db.database import Base
+
+def generate_job_id():
+    return str(uuid.uuid4())
+
+class PublicationJob(Base):
+    __tablename__ = "publication_jobs"
+
+    id = Column(String, primary_key=True, default=generate_job_id)
+    kind = Column(String, nullable=False)  # "post", "story"
+    target_id = Column(String, nullable=False, index=True)  # Post or story ID
+    platform = Column(String, nullable=False)  # "vk", "telegram", "instagram"
+
+    # Job state: "scheduled", "queued", "running", "done", "error", "cancelled"
+    status = Column(String, nullable=False, default="queued", index=True)
+    publish_at = Column(DateTime, nullable=True, index=True)  # UTC time a scheduled job becomes due
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    locked_by = Column(String, nullable=True)  # Worker that claimed the job
+    heartbeat_at = Column(DateTime, nullable=True)  # Last lease renewal by that worker
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class PublicationJob(BaseModel):
+    id: str
+    kind: str
+    target_id: str
+    platform: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    publish_at: Optional[datetime] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class PublicationJobList(BaseModel):
+    jobs: List[PublicationJob]
+
+    class Config:
+        orm_mode = True
+
+class PublicationSchedule(BaseModel):
+    publish_at: datetime  # Naive values are treated as UTC
+    platforms: Optional[List[str]] = None  # All unpublished platforms if omitted
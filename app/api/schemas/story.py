@@ -12,6 +12,10 @@ class StoryCreate(StoryBase):
     media_file_id: Optional[str] = None
     post_link: Optional[str] = None
 
+class StoryBatchCreate(BaseModel):
+    post_ids: List[str]
+    platforms: Optional[List[str]] = None  # All platforms if omitted
+
 class StoryPublicationLogBase(BaseModel):
     status: str
     message: Optional[str] = None
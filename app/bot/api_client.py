@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiohttp
+
+from app.config.settings import (
+    API_CLIENT_TIMEOUT, API_CLIENT_CONNECT_TIMEOUT,
+    API_CLIENT_LIMIT, API_CLIENT_LIMIT_PER_HOST, API_CLIENT_KEEPALIVE_TIMEOUT,
+    API_HOST, API_PORT
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between publication job status checks
+JOB_STATUS_POLL_INTERVAL = 2
+
+# Statuses of jobs that have not finished yet
+JOB_ACTIVE_STATUSES = ("queued", "running")
+
+# Shared session used by the bot to talk to our API
+_session: Optional[aiohttp.ClientSession] = None
+
+def create_session() -> aiohttp.ClientSession:
+    """Create a keep-alive session for bot -> API requests."""
+    connector = aiohttp.TCPConnector(
+        limit=API_CLIENT_LIMIT,
+        limit_per_host=API_CLIENT_LIMIT_PER_HOST,
+        keepalive_timeout=API_CLIENT_KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=API_CLIENT_TIMEOUT,
+        connect=API_CLIENT_CONNECT_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the shared API session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        _session = create_session()
+        logger.info("API client session created")
+    return _session
+
+async def close_session():
+    """Close the shared API session."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("API client session closed")
+    _session = None
+
+@asynccontextmanager
+async def api_session():
+    """Yield the shared API session. The session stays open on exit."""
+    yield await get_session()
+
+def job_in_progress(job: dict) -> bool:
+    """Check whether a publication job is still queued or running."""
+    return job.get("status") in JOB_ACTIVE_STATUSES
+
+async def wait_for_job(session: aiohttp.ClientSession, job: dict) -> Optional[dict]:
+    """Poll a publication job until it finishes.
+
+    Returns the finished job if it succeeded and None if it failed. A job
+    that did not finish within API_CLIENT_TIMEOUT is returned as last seen
+    (queued or running, see job_in_progress): it keeps running and may
+    still succeed.
+    """
+    url = f"http://{API_HOST}:{API_PORT}/api/jobs/{job['id']}"
+    deadline = time.monotonic() + API_CLIENT_TIMEOUT
+
+    while job_in_progress(job):
+        if time.monotonic() >= deadline:
+            logger.warning(f"Job {job['id']} did not finish in {API_CLIENT_TIMEOUT}s")
+            return job
+
+        await asyncio.sleep(JOB_STATUS_POLL_INTERVAL)
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    job = await response.json()
+                else:
+                    logger.warning(f"Job {job['id']} status check failed: {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # The API may be restarting; the job survives in the database
+            logger.warning(f"Job {job['id']} status check failed: {str(e)}")
+
+    if job.get("status") != "done":
+        logger.error(f"Job {job['id']} failed: {job.get('error')}")
+        return None
+    return job
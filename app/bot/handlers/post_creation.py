@@ -3,11 +3,11 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-import aiohttp
 from datetime import datetime
 
 from app.bot.keyboards.main_keyboard import get_main_keyboard, get_skip_back_keyboard
 from app.config.settings import API_HOST, API_PORT
+from app.bot.api_client import api_session
 
 router = Router()
 
@@ -37,7 +37,7 @@ async def delete_previous_messages(message, state):
 async def create_post_api(text, photos, videos):
     """Send post data to API."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/posts/"
             data = {
                 "text": text,
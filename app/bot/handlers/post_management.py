@@ -2,15 +2,16 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-import aiohttp
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 from app.bot.keyboards.main_keyboard import (
     get_main_keyboard, get_post_actions_keyboard, get_skip_back_keyboard,
     get_media_management_keyboard, get_photo_management_keyboard, get_video_management_keyboard
 )
-from app.config.settings import API_HOST, API_PORT
+from app.config.settings import API_HOST, API_PORT, TIMEZONE
+from app.bot.api_client import api_session, job_in_progress, wait_for_job
 
 # Определение состояний для поиска постов
 class PostSearch(StatesGroup):
@@ -27,13 +28,20 @@ class PostEdit(StatesGroup):
     manage_videos = State()
     waiting_for_video_to_delete = State()
 
+# Определение состояний для планирования публикации
+class PostSchedule(StatesGroup):
+    waiting_for_time = State()
+
+# Названия платформ для сообщений
+PLATFORM_NAMES = {"vk": "ВК", "telegram": "ТГ", "instagram": "IG"}
+
 router = Router()
 
 # API client functions
 async def get_posts_api(is_archived=False, search_query=None):
     """Get posts from API with optional search query."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/posts/"
 
             # Add search parameter if provided
@@ -89,7 +97,7 @@ async def get_posts_api(is_archived=False, search_query=None):
 async def get_post_api(post_id):
     """Get a specific post from API."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}"
             print(f"Fetching post from {url}")
 
@@ -114,7 +122,7 @@ async def get_post_api(post_id):
 async def delete_post_api(post_id):
     """Delete a post via API."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}"
             print(f"Deleting post via {url}")
 
@@ -136,19 +144,19 @@ async def delete_post_api(post_id):
         return False
 
 async def publish_post_api(post_id, platform):
-    """Publish a post to a specific platform via API."""
+    """Queue a post for a platform via API and wait for the publication job."""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}/publish/{platform}"
-            print(f"Publishing post to {platform} via {url}")
+        async with api_session() as session:
+            url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}/publish/{platform}/queue"
+            print(f"Queueing post for {platform} via {url}")
 
             try:
                 async with session.post(url) as response:
                     print(f"API response status: {response.status}")
 
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
+                    if response.status == 202:
+                        job = await response.json()
+                        return await wait_for_job(session, job)
                     else:
                         error_text = await response.text()
                         print(f"API Error: {response.status} - {error_text}")
@@ -160,10 +168,31 @@ async def publish_post_api(post_id, platform):
         print(f"Error in publish_post_api: {str(e)}")
         return None
 
+async def publish_all_api(post_id):
+    """Publish a post to all platforms via API, yielding each platform's result as it finishes."""
+    try:
+        async with api_session() as session:
+            url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}/publish-all"
+            print(f"Publishing post to all platforms via {url}")
+
+            async with session.post(url) as response:
+                print(f"API response status: {response.status}")
+
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"API Error: {response.status} - {error_text}")
+                    return
+
+                async for line in response.content:
+                    if line.strip():
+                        yield json.loads(line)
+    except Exception as e:
+        print(f"Error in publish_all_api: {str(e)}")
+
 async def create_story_api(post_id, platform):
     """Create a story for a post via API."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/stories/{post_id}/platform/{platform}"
             print(f"Creating story for platform {platform} via {url}")
 
@@ -186,19 +215,19 @@ async def create_story_api(post_id, platform):
         return None
 
 async def publish_story_api(story_id):
-    """Publish a story via API."""
+    """Queue a story via API and wait for the publication job."""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"http://{API_HOST}:{API_PORT}/api/stories/{story_id}/publish"
-            print(f"Publishing story via {url}")
+        async with api_session() as session:
+            url = f"http://{API_HOST}:{API_PORT}/api/stories/{story_id}/publish/queue"
+            print(f"Queueing story via {url}")
 
             try:
                 async with session.post(url) as response:
                     print(f"API response status: {response.status}")
 
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
+                    if response.status == 202:
+                        job = await response.json()
+                        return await wait_for_job(session, job)
                     else:
                         error_text = await response.text()
                         print(f"API Error: {response.status} - {error_text}")
@@ -210,10 +239,89 @@ async def publish_story_api(story_id):
         print(f"Error in publish_story_api: {str(e)}")
         return None
 
+async def schedule_post_api(post_id, publish_at):
+    """Schedule a post for all unpublished platforms via API."""
+    try:
+        async with api_session() as session:
+            url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}/schedule"
+            print(f"Scheduling post via {url}")
+
+            try:
+                async with session.post(url, json={"publish_at": publish_at.isoformat()}) as response:
+                    print(f"API response status: {response.status}")
+
+                    if response.status == 201:
+                        result = await response.json()
+                        return result.get("jobs", [])
+                    else:
+                        error_text = await response.text()
+                        print(f"API Error: {response.status} - {error_text}")
+                        return None
+            except Exception as e:
+                print(f"Error during API request: {str(e)}")
+                return None
+    except Exception as e:
+        print(f"Error in schedule_post_api: {str(e)}")
+        return None
+
+async def get_scheduled_jobs_api():
+    """Get scheduled publication jobs from API."""
+    try:
+        async with api_session() as session:
+            url = f"http://{API_HOST}:{API_PORT}/api/jobs/"
+            params = {"status": "scheduled", "limit": 1000}
+
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        return result.get("jobs", [])
+                    else:
+                        error_text = await response.text()
+                        print(f"API Error: {response.status} - {error_text}")
+                        return []
+            except Exception as e:
+                print(f"Error during API request: {str(e)}")
+                return []
+    except Exception as e:
+        print(f"Error in get_scheduled_jobs_api: {str(e)}")
+        return []
+
+def format_publish_at(publish_at_str):
+    """Format a UTC publication time from the API in the bot's time zone."""
+    publish_at = datetime.fromisoformat(publish_at_str.replace("Z", "+00:00"))
+    if publish_at.tzinfo is None:
+        publish_at = publish_at.replace(tzinfo=timezone.utc)
+    return publish_at.astimezone(ZoneInfo(TIMEZONE)).strftime('%d.%m.%Y %H:%M')
+
+def parse_publish_at(text):
+    """Parse a publication time entered as 'ДД.ММ.ГГГГ ЧЧ:ММ' or 'ЧЧ:ММ'.
+
+    A bare time means the next occurrence of it. Returns an aware datetime
+    or None if the text cannot be parsed.
+    """
+    tz = ZoneInfo(TIMEZONE)
+    text = text.strip()
+    try:
+        return datetime.strptime(text, "%d.%m.%Y %H:%M").replace(tzinfo=tz)
+    except ValueError:
+        pass
+
+    try:
+        time_of_day = datetime.strptime(text, "%H:%M").time()
+    except ValueError:
+        return None
+
+    now = datetime.now(tz)
+    publish_at = datetime.combine(now.date(), time_of_day, tzinfo=tz)
+    if publish_at <= now:
+        publish_at += timedelta(days=1)
+    return publish_at
+
 async def update_post_api(post_id, text=None, photos=None, videos=None):
     """Update a post via API."""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with api_session() as session:
             url = f"http://{API_HOST}:{API_PORT}/api/posts/{post_id}"
             print(f"Updating post via {url}")
 
@@ -256,6 +364,12 @@ async def show_pending_posts(message: Message):
         posts = await get_posts_api(is_archived=False)
         print(f"Fetched {len(posts)} pending posts")
 
+        # Group scheduled publication times by post
+        scheduled = {}
+        for job in await get_scheduled_jobs_api():
+            if job.get("kind") == "post" and job.get("publish_at"):
+                scheduled.setdefault(job.get("target_id"), []).append(job)
+
         if not posts:
             # Create back button
             buttons = [[InlineKeyboardButton(text="🏠 Вернуться в главное меню", callback_data="back_to_main")]]
@@ -303,7 +417,14 @@ async def show_pending_posts(message: Message):
             # Добавляем статус Instagram
             ig_status = "✅" if post.get("is_published_instagram") else "❌"
 
-            response_text += f"   ВК: {vk_status}, ТГ: {tg_status}, IG: {ig_status}\n\n"
+            response_text += f"   ВК: {vk_status}, ТГ: {tg_status}, IG: {ig_status}\n"
+
+            # Добавляем запланированные публикации
+            for job in sorted(scheduled.get(post.get("id"), []), key=lambda job: job["publish_at"]):
+                platform_name = PLATFORM_NAMES.get(job.get("platform"), job.get("platform"))
+                response_text += f"   🕒 {platform_name}: {format_publish_at(job['publish_at'])}\n"
+
+            response_text += "\n"
 
             # Add button for this post
             post_id = post.get('id')
@@ -799,7 +920,12 @@ async def publish_to_vk(callback: CallbackQuery):
     try:
         result = await publish_post_api(post_id, "vk")
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация в ВК ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Опубликовано в ВК!",
                 reply_markup=get_post_actions_keyboard()
@@ -847,7 +973,12 @@ async def publish_to_telegram(callback: CallbackQuery):
     try:
         result = await publish_post_api(post_id, "telegram")
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация в Telegram ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Опубликовано в Telegram!",
                 reply_markup=get_post_actions_keyboard()
@@ -895,7 +1026,12 @@ async def publish_to_instagram(callback: CallbackQuery):
     try:
         result = await publish_post_api(post_id, "instagram")
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация в Instagram ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Опубликовано в Instagram!",
                 reply_markup=get_post_actions_keyboard()
@@ -1022,7 +1158,12 @@ async def publish_story_to_vk(callback: CallbackQuery):
         # Publish story
         result = await publish_story_api(story.get("id"))
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация сторис в ВК ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Сторис опубликован в ВК!",
                 reply_markup=get_post_actions_keyboard()
@@ -1081,7 +1222,12 @@ async def publish_story_to_telegram(callback: CallbackQuery):
         # Publish story
         result = await publish_story_api(story.get("id"))
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация сторис в Telegram ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Сторис опубликован в Telegram!",
                 reply_markup=get_post_actions_keyboard()
@@ -1140,7 +1286,12 @@ async def publish_story_to_instagram(callback: CallbackQuery):
         # Publish story
         result = await publish_story_api(story.get("id"))
 
-        if result:
+        if result and job_in_progress(result):
+            await status_message.edit_text(
+                f"{status_message.text.split('⏳')[0]}\n\n⏳ Публикация сторис в Instagram ещё выполняется (задача {result['id']}, статус: {result['status']}). Проверьте результат позже.",
+                reply_markup=get_post_actions_keyboard()
+            )
+        elif result:
             await status_message.edit_text(
                 f"{status_message.text.split('⏳')[0]}\n\n✅ Сторис опубликован в Instagram!",
                 reply_markup=get_post_actions_keyboard()
@@ -1174,26 +1325,35 @@ async def publish_to_all(callback: CallbackQuery):
         await callback.answer("❌ Пост не найден.", show_alert=True)
         return
 
+    # Сразу отвечаем на callback, чтобы избежать ошибки "query is too old"
+    await callback.answer("Публикую во все соцсети...")
+
     # Publish post to all platforms
-    await callback.message.edit_text(f"{callback.message.text}\n\n⏳ Публикую во все соцсети...")
+    base_text = callback.message.text
+    status_message = await callback.message.edit_text(f"{base_text}\n\n⏳ Публикую во все соцсети...")
+
+    platform_names = {"vk": "ВК", "telegram": "Telegram", "instagram": "Instagram"}
+    pending = [platform for platform in platform_names if not post.get(f"is_published_{platform}")]
 
     try:
         results = []
 
-        # Publish to VK if not already published
-        if not post.get("is_published_vk"):
-            vk_result = await publish_post_api(post_id, "vk")
-            results.append(("ВК", vk_result is not None))
+        # Platforms are published concurrently; show each result as soon as it arrives
+        async for result in publish_all_api(post_id):
+            platform = result.get("platform")
+            results.append((platform_names.get(platform, platform), result.get("success")))
+            if platform in pending:
+                pending.remove(platform)
 
-        # Publish to Telegram if not already published
-        if not post.get("is_published_telegram"):
-            tg_result = await publish_post_api(post_id, "telegram")
-            results.append(("Telegram", tg_result is not None))
+            if pending:
+                result_text = "\n\n📤 Результаты публикации:\n"
+                for name, success in results:
+                    result_text += f"{name}: {'✅' if success else '❌'}\n"
+                result_text += "\n⏳ Публикую: " + ", ".join(platform_names[p] for p in pending)
+                await status_message.edit_text(f"{base_text}{result_text}")
 
-        # Publish to Instagram if not already published
-        if not post.get("is_published_instagram"):
-            ig_result = await publish_post_api(post_id, "instagram")
-            results.append(("Instagram", ig_result is not None))
+        # Platforms that never reported back are treated as failed
+        results.extend((platform_names[p], False) for p in pending)
 
         # Format results
         result_text = "\n\n📤 Результаты публикации:\n"
@@ -1201,18 +1361,16 @@ async def publish_to_all(callback: CallbackQuery):
             status = "✅" if success else "❌"
             result_text += f"{platform}: {status}\n"
 
-        await callback.message.edit_text(
-            f"{callback.message.text.split('⏳')[0]}{result_text}",
+        await status_message.edit_text(
+            f"{base_text}{result_text}",
             reply_markup=get_post_actions_keyboard()
         )
     except Exception as e:
-        await callback.message.edit_text(
-            f"{callback.message.text.split('⏳')[0]}\n\n❌ Ошибка: {str(e)}",
+        await status_message.edit_text(
+            f"{base_text}\n\n❌ Ошибка: {str(e)}",
             reply_markup=get_post_actions_keyboard()
         )
 
-    await callback.answer()
-
 @router.callback_query(F.data == "delete")
 async def confirm_delete_post(callback: CallbackQuery):
     """Ask for confirmation before deleting a post."""
@@ -1324,6 +1482,82 @@ async def edit_post(callback: CallbackQuery, state: FSMContext):
 
     await callback.answer()
 
+@router.callback_query(F.data == "schedule")
+async def schedule_post(callback: CallbackQuery, state: FSMContext):
+    """Ask for the time to publish the selected post."""
+    user_data = callback.bot.user_data.get(callback.from_user.id, {})
+    post_id = user_data.get("selected_post")
+
+    if not post_id:
+        await callback.answer("❌ Пост не выбран.", show_alert=True)
+        return
+
+    buttons = [[InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_schedule")]]
+    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+
+    await callback.message.edit_text(
+        f"{callback.message.text}\n\n"
+        f"🕒 Введите время публикации во все неопубликованные соцсети:\n"
+        f"ДД.ММ.ГГГГ ЧЧ:ММ или просто ЧЧ:ММ (ближайшее такое время)\n"
+        f"Часовой пояс: {TIMEZONE}",
+        reply_markup=keyboard
+    )
+
+    await state.update_data(schedule_post_id=post_id)
+    await state.set_state(PostSchedule.waiting_for_time)
+
+    await callback.answer()
+
+@router.callback_query(PostSchedule.waiting_for_time, F.data == "cancel_schedule")
+async def cancel_schedule(callback: CallbackQuery, state: FSMContext):
+    """Cancel scheduling and return to the post."""
+    await state.clear()
+
+    await callback.message.edit_text(
+        callback.message.text.split("🕒")[0].rstrip(),
+        reply_markup=get_post_actions_keyboard()
+    )
+
+    await callback.answer()
+
+@router.message(PostSchedule.waiting_for_time)
+async def process_schedule_time(message: Message, state: FSMContext):
+    """Schedule the post for the entered time."""
+    publish_at = parse_publish_at(message.text or "")
+
+    cancel_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_schedule")]
+    ])
+
+    if publish_at is None:
+        await message.reply(
+            "❌ Не удалось разобрать время. Введите ДД.ММ.ГГГГ ЧЧ:ММ или ЧЧ:ММ.",
+            reply_markup=cancel_keyboard
+        )
+        return
+
+    if publish_at <= datetime.now(publish_at.tzinfo):
+        await message.reply("❌ Это время уже прошло. Введите время в будущем.", reply_markup=cancel_keyboard)
+        return
+
+    data = await state.get_data()
+    post_id = data.get("schedule_post_id")
+    await state.clear()
+
+    jobs = await schedule_post_api(post_id, publish_at)
+
+    if jobs is None:
+        await message.reply("❌ Ошибка при планировании публикации.", reply_markup=get_post_actions_keyboard())
+    elif not jobs:
+        await message.reply("ℹ️ Пост уже опубликован во всех соцсетях.", reply_markup=get_post_actions_keyboard())
+    else:
+        platforms = ", ".join(PLATFORM_NAMES.get(job.get("platform"), job.get("platform")) for job in jobs)
+        await message.reply(
+            f"✅ Публикация запланирована на {publish_at.strftime('%d.%m.%Y %H:%M')}\n"
+            f"Соцсети: {platforms}",
+            reply_markup=get_post_actions_keyboard()
+        )
+
 @router.callback_query(F.data == "back_to_posts")
 async def back_to_posts(callback: CallbackQuery):
     """Go back to the posts list."""
@@ -23,6 +23,7 @@ def get_post_actions_keyboard(from_archive=False) -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="📢 в ТГ", callback_data="publish_telegram"),
             InlineKeyboardButton(text="📸 в IG", callback_data="publish_instagram")
         ],
+        [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="schedule")],
         # Social media buttons for stories (только кнопка меню, без подкнопок)
         [InlineKeyboardButton(text="📱 Сторис", callback_data="stories_menu")],
         # Edit and delete buttons
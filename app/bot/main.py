@@ -1,18 +1,19 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
+from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
-from app.config.settings import TELEGRAM_BOT_TOKEN
 from app.bot.handlers import start, post_creation, post_management
 from app.bot.middlewares.auth import AuthMiddleware
+from app.bot.api_client import get_session, close_session
+from app.utils.telegram_bot import get_bot
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Initialize bot and dispatcher
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+# Initialize bot (shared with the API and workers) and dispatcher
+bot = get_bot()
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
@@ -35,6 +36,17 @@ async def set_commands():
     ]
     await bot.set_my_commands(commands)
 
+async def on_startup():
+    """Open the shared API client session."""
+    await get_session()
+
+async def on_shutdown():
+    """Close the shared API client session."""
+    await close_session()
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
 async def main():
     """Main function."""
     # Set bot commands
@@ -11,6 +11,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # Telegram Bot settings
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_BOT_CONNECTION_LIMIT = int(os.getenv("TELEGRAM_BOT_CONNECTION_LIMIT", "100"))
+# Bot API server, also used for file downloads (e.g. a fake_platforms server for benchmarks)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
 ALLOWED_USER_IDS = [int(user_id) for user_id in os.getenv("ALLOWED_USER_IDS", "").split(",") if user_id]
 
 # VK API settings
@@ -18,9 +21,26 @@ VK_APP_ID = os.getenv("VK_APP_ID")
 VK_APP_SECRET = os.getenv("VK_APP_SECRET")
 VK_ACCESS_TOKEN = os.getenv("VK_ACCESS_TOKEN")
 VK_GROUP_ID = os.getenv("VK_GROUP_ID")
+VK_UPLOAD_CONCURRENCY = int(os.getenv("VK_UPLOAD_CONCURRENCY", "4"))
+# Send VK API calls to another server instead of api.vk.ru (e.g. a fake_platforms server)
+VK_API_URL = os.getenv("VK_API_URL")
+
+# Instagram settings (the session file keeps the login between restarts)
+INSTAGRAM_USERNAME = os.getenv("INSTAGRAM_USERNAME", "")
+INSTAGRAM_PASSWORD = os.getenv("INSTAGRAM_PASSWORD", "")
+INSTAGRAM_SESSION_PATH = os.getenv("INSTAGRAM_SESSION_PATH", "instagram_session.json")
+# Send Instagram API calls to another server instead of instagram.com (e.g. a fake_platforms server)
+INSTAGRAM_API_URL = os.getenv("INSTAGRAM_API_URL")
+
+# Telegram file_path resolution cache (Telegram keeps file paths valid for at least 1 hour)
+TELEGRAM_FILE_PATH_TTL = int(os.getenv("TELEGRAM_FILE_PATH_TTL", "3000"))
 
 # Telegram Channel settings
 TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID")
+# Channels posts are published to, comma-separated (defaults to TELEGRAM_CHANNEL_ID)
+TELEGRAM_CHANNEL_IDS = [
+    channel.strip() for channel in os.getenv("TELEGRAM_CHANNEL_IDS", TELEGRAM_CHANNEL_ID or "").split(",") if channel.strip()
+]
 
 # Database settings
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
@@ -30,13 +50,82 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Time zone the bot uses to read and show publication times
+TIMEZONE = os.getenv("TIMEZONE", "Europe/Moscow")
+
 # API settings
 API_HOST = os.getenv("API_HOST", "localhost")
 API_PORT = int(os.getenv("API_PORT", "8002"))
 
+# Bot -> API client settings (timeouts in seconds)
+API_CLIENT_TIMEOUT = float(os.getenv("API_CLIENT_TIMEOUT", "300"))
+API_CLIENT_CONNECT_TIMEOUT = float(os.getenv("API_CLIENT_CONNECT_TIMEOUT", "10"))
+API_CLIENT_LIMIT = int(os.getenv("API_CLIENT_LIMIT", "100"))
+API_CLIENT_LIMIT_PER_HOST = int(os.getenv("API_CLIENT_LIMIT_PER_HOST", "20"))
+API_CLIENT_KEEPALIVE_TIMEOUT = float(os.getenv("API_CLIENT_KEEPALIVE_TIMEOUT", "60"))
+
+# Thread pools for blocking platform SDK calls (vk_api, instagrapi, requests)
+PLATFORM_EXECUTOR_WORKERS = {
+    "default": int(os.getenv("PLATFORM_EXECUTOR_WORKERS", "4")),
+    "vk": int(os.getenv("VK_EXECUTOR_WORKERS", "4")),
+    "instagram": int(os.getenv("INSTAGRAM_EXECUTOR_WORKERS", "2")),
+}
+PLATFORM_SLOW_CALL_SECONDS = float(os.getenv("PLATFORM_SLOW_CALL_SECONDS", "30"))
+
+# Outbound rate limits as (requests per second, burst), one token bucket per platform account.
+# "telegram" is the bot-wide limit, "telegram_chat" applies to each of TELEGRAM_CHANNEL_IDS (20 messages a minute in channels).
+PLATFORM_RATE_LIMITS = {
+    "telegram": (float(os.getenv("TELEGRAM_RATE_LIMIT", "30")), int(os.getenv("TELEGRAM_RATE_BURST", "30"))),
+    "telegram_chat": (float(os.getenv("TELEGRAM_CHAT_RATE_LIMIT", "0.33")), int(os.getenv("TELEGRAM_CHAT_RATE_BURST", "20"))),
+    "vk": (float(os.getenv("VK_RATE_LIMIT", "3")), int(os.getenv("VK_RATE_BURST", "3"))),
+    "instagram": (float(os.getenv("INSTAGRAM_RATE_LIMIT", "0.5")), int(os.getenv("INSTAGRAM_RATE_BURST", "3"))),
+}
+# Retries after a rate-limit error, and pauses used when the server gives no retry-after hint (seconds)
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+VK_TOO_MANY_RPS_PAUSE = float(os.getenv("VK_TOO_MANY_RPS_PAUSE", "1"))
+INSTAGRAM_THROTTLE_PAUSE = float(os.getenv("INSTAGRAM_THROTTLE_PAUSE", "60"))
+
+# Failed publications are retried with jittered exponential backoff (seconds) while the
+# platform's circuit breaker is closed. The breaker opens after CIRCUIT_FAILURE_THRESHOLD
+# network errors in a row and lets a probe call through after CIRCUIT_RESET_TIMEOUT.
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "3"))
+PUBLISH_BACKOFF_BASE = float(os.getenv("PUBLISH_BACKOFF_BASE", "2"))
+PUBLISH_BACKOFF_MAX = float(os.getenv("PUBLISH_BACKOFF_MAX", "30"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "60"))
+
+# Publication job queue (workers draining publication_jobs, poll interval in seconds)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# A running job's worker renews its lease several times per JOB_LEASE_TIMEOUT seconds; jobs
+# whose lease expired (their process died) are re-queued by any process's worker pool
+JOB_LEASE_TIMEOUT = float(os.getenv("JOB_LEASE_TIMEOUT", "120"))
+
 # Media storage settings
 MEDIA_DIR = BASE_DIR / "media"
 MEDIA_STRUCTURE = "{year}/{month}/{day}/{post_name}"
 
-# Ensure media directory exists
+# Shared Telegram media cache settings
+MEDIA_CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", str(MEDIA_DIR / ".cache")))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Rendered story images, reused across publishes and retries
+STORY_CACHE_DIR = Path(os.getenv("STORY_CACHE_DIR", str(MEDIA_DIR / ".stories")))
+STORY_CACHE_MAX_BYTES = int(os.getenv("STORY_CACHE_MAX_MB", "256")) * 1024 * 1024
+# Story images render in worker processes; renders beyond the workers wait in a queue of this size
+STORY_RENDER_WORKERS = max(1, int(os.getenv("STORY_RENDER_WORKERS", str(min(2, os.cpu_count() or 1)))))
+STORY_RENDER_QUEUE = int(os.getenv("STORY_RENDER_QUEUE", "16"))
+# Story text font, the first existing file is used (comma-separated paths; Liberation Sans has Arial's metrics)
+STORY_FONT_PATHS = [
+    path.strip() for path in os.getenv(
+        "STORY_FONT_PATHS",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf,/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    ).split(",") if path.strip()
+]
+
+# Background media prefetch (number of concurrent downloads)
+MEDIA_PREFETCH_CONCURRENCY = int(os.getenv("MEDIA_PREFETCH_CONCURRENCY", "4"))
+
+# Ensure media directories exist
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+MEDIA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
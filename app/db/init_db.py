@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 
 from app.db.database import SessionLocal, engine, Base
 from app.api.models.post import Post, PublicationLog
+from app.api.models.job import PublicationJob
+from app.api.models.checkpoint import PublicationCheckpoint
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -0,0 +1,31 @@
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class BaseUrlAdapter(HTTPAdapter):
+    """requests transport adapter that sends requests for one URL prefix to another base URL.
+
+    vk_api and instagrapi hardcode their API hosts; mounting this adapter
+    on their sessions points them at another server (e.g. the fake
+    platforms used for benchmarks) without touching the SDKs.
+    """
+
+    def __init__(self, prefix: str, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(self.prefix):
+            request.url = self.base_url + request.url[len(self.prefix):]
+        return super().send(request, **kwargs)
+
+def redirect_session(session: requests.Session, base_url: str, *prefixes: str):
+    """Send a session's requests for the given URL prefixes to base_url."""
+    for prefix in prefixes:
+        session.mount(prefix, BaseUrlAdapter(prefix, base_url))
+    logger.info(f"Redirecting {', '.join(prefixes)} to {base_url}")
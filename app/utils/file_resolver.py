@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Tuple
+
+from aiogram.types import File
+
+from app.config.settings import TELEGRAM_FILE_PATH_TTL
+from app.utils.telegram_bot import get_bot
+
+logger = logging.getLogger(__name__)
+
+# Expired entries are pruned once the cache grows past this size
+MAX_ENTRIES = 10000
+
+
+class TelegramFileResolver:
+    """TTL cache in front of Bot.get_file.
+
+    Telegram guarantees a file_path stays downloadable for at least an hour,
+    so resolved paths are reused for ``ttl`` seconds. Concurrent lookups of
+    the same file_id share a single getFile request.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._cache: Dict[str, Tuple[float, File]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def _get_file(self, file_id: str) -> File:
+        """Call getFile on the Telegram Bot API."""
+        return await get_bot().get_file(file_id)
+
+    def _prune(self):
+        """Drop expired entries."""
+        now = time.monotonic()
+        for file_id in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[file_id]
+
+    async def _fetch(self, file_id: str) -> File:
+        """Resolve a file_id and cache the result."""
+        try:
+            file_info = await self._get_file(file_id)
+        finally:
+            self._pending.pop(file_id, None)
+
+        if len(self._cache) >= MAX_ENTRIES:
+            self._prune()
+        self._cache[file_id] = (time.monotonic() + self.ttl, file_info)
+        return file_info
+
+    async def resolve(self, file_id: str) -> File:
+        """Return file info (file_unique_id, file_path, file_size) for a file_id."""
+        entry = self._cache.get(file_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(file_id)
+        if pending is not None:
+            # Join a request already in flight for the same file_id
+            self.hits += 1
+        else:
+            self.misses += 1
+            # The request runs in its own task, so cancelling the caller that
+            # started it doesn't cancel it for the others
+            pending = asyncio.create_task(self._fetch(file_id))
+            # Mark the exception as retrieved if every caller was cancelled
+            pending.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._pending[file_id] = pending
+        return await asyncio.shield(pending)
+
+    def invalidate(self, file_id: str):
+        """Forget a resolved file_path, e.g. after the download link expired."""
+        self._cache.pop(file_id, None)
+
+    def stats(self) -> dict:
+        """Return resolver counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._cache),
+            "ttl": self.ttl,
+        }
+
+
+# Process-wide resolver shared by the API and all workers
+file_resolver = TelegramFileResolver(TELEGRAM_FILE_PATH_TTL)
@@ -0,0 +1,332 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import ssl
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+from app.config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES
+from app.utils.file_resolver import file_resolver
+from app.utils.telegram_bot import get_http_session
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_key(file_unique_id: str) -> str:
+    """Build a content-addressed cache key from a Telegram file_unique_id."""
+    return hashlib.sha256(file_unique_id.encode("utf-8")).hexdigest()
+
+
+class KeyedLocks:
+    """One asyncio lock per key, kept while anyone holds or waits for it."""
+
+    def __init__(self):
+        # key -> [lock, number of holders and waiters]
+        self._locks: Dict[str, List] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock of a key."""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+
+class MediaCache:
+    """On-disk cache of Telegram media shared by the API and all publishers.
+
+    Files are stored under ``MEDIA_CACHE_DIR`` named by the sha256 of their
+    ``file_unique_id`` (which, unlike ``file_id``, is stable across bots and
+    requests). The total size is bounded and the least recently used files
+    are evicted first.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+        # key -> (path, size), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+
+        # file_id -> cache key, so repeated lookups skip Telegram entirely
+        self._file_keys: Dict[str, str] = {}
+        self._locks = KeyedLocks()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self):
+        """Index the files already present on disk, oldest first."""
+        if self._loaded:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = [p for p in self.cache_dir.iterdir() if p.is_file() and not p.name.endswith(".part")]
+        files.sort(key=lambda p: p.stat().st_mtime)
+
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = (path, size)
+            self._total_bytes += size
+
+        self._loaded = True
+        logger.info(f"Media cache loaded: {len(self._entries)} files, {self._total_bytes} bytes")
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        """Return the cached path for a key and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            # Another process may have filled the cache since we indexed it
+            for path in self.cache_dir.glob(f"{key}*"):
+                if path.is_file() and not path.name.endswith(".part"):
+                    self._add(key, path)
+                    entry = self._entries[key]
+                    break
+            else:
+                return None
+
+        path = entry[0]
+        if not path.exists():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        try:
+            os.utime(path)  # keep the LRU order across restarts
+        except OSError:
+            pass
+        return path
+
+    def _add(self, key: str, path: Path):
+        """Register a file in the index and evict old entries if needed."""
+        if key in self._entries:
+            self._remove(key)
+
+        size = path.stat().st_size
+        self._entries[key] = (path, size)
+        self._total_bytes += size
+        self._evict(keep=key)
+
+    def _remove(self, key: str):
+        """Drop a key from the index."""
+        path, size = self._entries.pop(key)
+        self._total_bytes -= size
+        return path
+
+    def _evict(self, keep: Optional[str] = None):
+        """Evict least recently used files until the cache fits its budget."""
+        while self._total_bytes > self.max_bytes:
+            key = next((k for k in self._entries if k != keep), None)
+            if key is None:
+                break
+
+            path = self._remove(key)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+            self.evictions += 1
+            logger.info(f"Evicted {path.name} from media cache")
+
+    async def _resolve(self, file_id: str):
+        """Get file_unique_id and file_path for a file_id from Telegram."""
+        file_info = await file_resolver.resolve(file_id)
+        return file_info.file_unique_id, file_info.file_path
+
+    def file_url(self, file_path: str) -> str:
+        """Build the Telegram download URL for a file_path."""
+        return f"{TELEGRAM_API_URL}/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
+
+    def ssl_context(self) -> ssl.SSLContext:
+        """Create a custom SSL context that doesn't verify certificates."""
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context
+
+    async def _download(self, file_path: str, destination: Path) -> bool:
+        """Stream a file from Telegram to the destination path."""
+        file_url = self.file_url(file_path)
+
+        try:
+            session = await get_http_session()
+            async with session.get(file_url, ssl=self.ssl_context()) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to download file from Telegram: {response.status}")
+                    return False
+
+                # File writes go to a worker thread, the event loop is shared with the bot and the workers
+                f = await asyncio.to_thread(open, destination, "wb")
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    f.close()
+                return True
+        except Exception as e:
+            logger.error(f"Error downloading file from Telegram: {str(e)}")
+
+        # Fallback to curl (curl handles SSL issues better)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "curl", "-s", "-f", "-k", file_url, "-o", str(destination),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            if process.returncode == 0:
+                return True
+            logger.error(f"Curl failed with return code {process.returncode}: {stderr.decode()}")
+        except Exception as e:
+            logger.error(f"Error using curl fallback: {str(e)}")
+        return False
+
+    def cached_path(self, file_id: str) -> Optional[Path]:
+        """Return the cached path for a file_id seen before, without any network I/O."""
+        self._load()
+
+        key = self._file_keys.get(file_id)
+        if key:
+            return self._lookup(key)
+        return None
+
+    async def resolve(self, file_id: str) -> Optional[Tuple[str, str]]:
+        """Resolve a file_id to its cache key and Telegram file_path."""
+        try:
+            file_unique_id, file_path = await self._resolve(file_id)
+        except Exception as e:
+            logger.error(f"Error getting file info for {file_id} from Telegram: {str(e)}")
+            return None
+
+        key = cache_key(file_unique_id)
+        self._file_keys[file_id] = key
+        return key, file_path
+
+    async def get_key(self, file_id: str) -> Optional[str]:
+        """Return the cache key of a Telegram file, which identifies its content."""
+        key = self._file_keys.get(file_id)
+        if key:
+            return key
+        resolved = await self.resolve(file_id)
+        return resolved[0] if resolved else None
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the cached path for a cache key if present."""
+        self._load()
+        return self._lookup(key)
+
+    def part_path(self, key: str, file_path: Optional[str]) -> Path:
+        """Return a unique temporary path for an in-progress download."""
+        suffix = Path(file_path).suffix if file_path else ""
+        return self.cache_dir / f"{key}{suffix}.{uuid.uuid4().hex}.part"
+
+    async def store(self, key: str, tmp_path: Path) -> Path:
+        """Move a completed download into the cache."""
+        suffix = "".join(tmp_path.suffixes[:-2])
+        path = self.cache_dir / f"{key}{suffix}"
+        await asyncio.to_thread(os.replace, tmp_path, path)
+        self._add(key, path)
+        return path
+
+    async def get_path(self, file_id: str) -> Optional[Path]:
+        """Return a local path for a Telegram file, downloading it at most once."""
+        path = self.cached_path(file_id)
+        if path:
+            self.hits += 1
+            return path
+
+        resolved = await self.resolve(file_id)
+        if resolved is None:
+            return None
+        key, file_path = resolved
+
+        async with self._locks.hold(key):
+            path = self._lookup(key)
+            if path:
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            tmp_path = self.part_path(key, file_path)
+            try:
+                if not await self._download(file_path, tmp_path):
+                    # The file_path may have expired, resolve it again next time
+                    file_resolver.invalidate(file_id)
+                    return None
+                path = await self.store(key, tmp_path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+
+            logger.info(f"Cached Telegram file {file_id} as {path.name}")
+            return path
+
+    async def get_bytes(self, file_id: str) -> Optional[bytes]:
+        """Return the content of a Telegram file through the cache."""
+        path = await self.get_path(file_id)
+        if path is None:
+            return None
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            # Evicted between lookup and read
+            return None
+
+    async def copy_to(self, file_id: str, destination) -> bool:
+        """Place a Telegram file at the destination path, hard-linking when possible."""
+        path = await self.get_path(file_id)
+        if path is None:
+            return False
+
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = destination.with_name(destination.name + ".part")
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                await asyncio.to_thread(shutil.copyfile, path, tmp_path)
+            os.replace(tmp_path, destination)
+        except FileNotFoundError:
+            # Evicted between lookup and copy
+            return False
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return True
+
+    def stats(self) -> dict:
+        """Return cache counters."""
+        self._load()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "files": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Process-wide cache instance
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+from app.config.settings import PLATFORM_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket shared by all callers of one platform account.
+
+    Works from both the event loop (acquire) and SDK worker threads
+    (acquire_sync). Callers reserve tokens under a lock and then sleep
+    outside it, so waiting never blocks other callers. pause() applies a
+    server-provided retry-after hint to everyone using the bucket.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()  # In the future while paused
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.pauses = 0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _reserve(self, cost: float) -> float:
+        """Take tokens and return how long the caller has to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= cost
+
+            delay = (self._updated - now) + max(0.0, -self._tokens) / self.rate
+            self.acquired += 1
+            if delay > 0:
+                self.waited += 1
+                self.total_wait_seconds += delay
+            return delay
+
+    async def acquire(self, cost: float = 1):
+        """Wait for tokens on the event loop."""
+        delay = self._reserve(cost)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, cost: float = 1):
+        """Wait for tokens in a worker thread."""
+        delay = self._reserve(cost)
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given time, e.g. after a 429 with retry-after.
+
+        When the pause ends one request may go straight away (the retry), the
+        rest follow at the normal rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._updated:
+                self._tokens = min(self._tokens, 1.0)
+                self._updated = until
+            self.pauses += 1
+
+    def stats(self) -> dict:
+        """Return bucket counters."""
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "pauses": self.pauses,
+        }
+
+
+_limiters: Dict[Tuple[str, str], TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(platform: str, account: str = "default") -> TokenBucket:
+    """Get the token bucket for a platform account, creating it on first use."""
+    key = (platform, str(account))
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            rate, burst = PLATFORM_RATE_LIMITS[platform]
+            limiter = _limiters[key] = TokenBucket(rate, burst)
+        return limiter
+
+def limiter_stats() -> dict:
+    """Return counters for all token buckets, keyed by "platform:account"."""
+    with _limiters_lock:
+        return {f"{platform}:{account}": limiter.stats() for (platform, account), limiter in _limiters.items()}
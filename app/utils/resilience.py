@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+import aiohttp
+import requests
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from instagrapi.exceptions import ClientConnectionError, ClientRequestTimeout
+from vk_api.exceptions import ApiHttpError
+
+from app.config.settings import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, PUBLISH_BACKOFF_BASE, PUBLISH_BACKOFF_MAX
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the platform is unreachable or failing, not that the request was wrong
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    asyncio.TimeoutError,
+    aiohttp.ClientConnectionError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    TelegramNetworkError,
+    TelegramServerError,
+    ClientConnectionError,
+    ClientRequestTimeout,
+)
+
+def is_transient(error: Exception) -> bool:
+    """Check whether an error is worth retrying later (network failures, timeouts, 5xx)."""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    if isinstance(error, (ApiHttpError, requests.exceptions.HTTPError)):
+        response = getattr(error, "response", None)
+        return response is not None and response.status_code >= 500
+    return False
+
+# Transient failures recorded by the current task and the tasks it starts, see track_failures
+_tracked_failures: ContextVar[Optional[List[str]]] = ContextVar("tracked_failures", default=None)
+
+@contextmanager
+def track_failures() -> Iterator[List[str]]:
+    """Collect the platforms of transient failures recorded inside the block.
+
+    Only failures of calls made by this task (and tasks it starts) are
+    collected, unlike the breaker state, which all jobs for a platform share.
+    """
+    failures: List[str] = []
+    token = _tracked_failures.set(failures)
+    try:
+        yield failures
+    finally:
+        _tracked_failures.reset(token)
+
+def backoff_delay(attempt: int, base: float = PUBLISH_BACKOFF_BASE, cap: float = PUBLISH_BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given 0-based retry number.
+
+    Random delays keep retries of many jobs from hitting a recovering
+    platform at the same moment.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitOpenError(Exception):
+    """A platform is failing and calls to it are rejected until the next probe."""
+
+    def __init__(self, platform: str, retry_in: float):
+        self.platform = platform
+        self.retry_in = retry_in
+        super().__init__(f"{platform} is unavailable, retry in {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """Circuit breaker for the calls to one platform.
+
+    After failure_threshold transient errors in a row the circuit opens and
+    calls fail immediately with CircuitOpenError. Once reset_timeout has
+    passed a single probe call is let through (half-open): its success
+    closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, platform: str, failure_threshold: int, reset_timeout: float):
+        self.platform = platform
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+        self.last_failure_at: Optional[float] = None
+        self.total_failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def check(self, probe: bool = True):
+        """Raise CircuitOpenError if a call to the platform shouldn't be made now.
+
+        With probe=False only an open circuit that isn't due for a probe
+        raises, and the probe is left to the first actual platform call.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if not probe and (self.state == "half_open" or retry_in <= 0):
+                return
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+                self._probing = False
+
+            # A probe that never reported back (e.g. cancelled) is replaced after reset_timeout
+            if self.state == "half_open" and (not self._probing or time.monotonic() - self._probe_started > self.reset_timeout):
+                # This call is the probe
+                self._probing = True
+                self._probe_started = time.monotonic()
+                logger.info(f"Circuit for {self.platform} is half-open, probing")
+                return
+
+            self.rejected += 1
+            raise CircuitOpenError(self.platform, max(retry_in, 0.0))
+
+    def record_success(self):
+        """Record a call the platform answered."""
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit for {self.platform} closed, platform is back")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Record a transient failure of a call."""
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            self.last_failure_at = time.monotonic()
+            failures = _tracked_failures.get()
+            if failures is not None:
+                failures.append(self.platform)
+
+            if self.state == "half_open" or (self.state == "closed" and self._failures >= self.failure_threshold):
+                logger.warning(f"Circuit for {self.platform} opened after {self._failures} failures")
+                self.state = "open"
+                self._opened_at = self.last_failure_at
+                self._probing = False
+                self.opened += 1
+
+    def stats(self) -> dict:
+        """Return breaker state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_in": round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 1) if self.state == "open" else None,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(platform: str) -> CircuitBreaker:
+    """Get the circuit breaker for a platform, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(platform)
+        if breaker is None:
+            breaker = _breakers[platform] = CircuitBreaker(platform, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        return breaker
+
+def breaker_stats() -> dict:
+    """Return the state of all circuit breakers, keyed by platform."""
+    with _breakers_lock:
+        return {platform: breaker.stats() for platform, breaker in _breakers.items()}
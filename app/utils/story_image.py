@@ -0,0 +1,225 @@
+import io
+import logging
+import math
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+# Story image drawing. Runs in the render pool's worker processes, so this
+# module imports nothing from the app; fonts are configured by init_worker.
+
+logger = logging.getLogger(__name__)
+
+# Story format
+STORY_SIZE = (1080, 1920)
+
+# Bump when a template draws differently, so cached renders are not reused
+TEMPLATE_VERSION = 3
+
+Color = Tuple[int, int, int]
+
+
+class FontRegistry:
+    """The story font, located once and loaded once per size.
+
+    The first existing file of the configured paths is used. Without one
+    (or before configure is called), Pillow's built-in font is scaled to
+    the requested size; it has no Cyrillic glyphs.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.path: Optional[str] = None
+        self._fonts: Dict[int, ImageFont.FreeTypeFont] = {}
+
+    def configure(self, paths: Iterable[str]):
+        self.paths = [path for path in paths if path]
+        self.path = next((path for path in self.paths if os.path.isfile(path)), None)
+        self._fonts = {}
+        if self.path is None:
+            logger.warning(f"No story font found in {self.paths}, using Pillow's default font")
+
+    @property
+    def name(self) -> str:
+        """Font file name, part of the render cache key."""
+        return os.path.basename(self.path) if self.path else "default"
+
+    def get(self, size: int) -> ImageFont.FreeTypeFont:
+        font = self._fonts.get(size)
+        if font is None:
+            if self.path:
+                font = ImageFont.truetype(self.path, size)
+            else:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    # Pillow < 10.1 only has the fixed-size bitmap font
+                    font = ImageFont.load_default()
+            self._fonts[size] = font
+        return font
+
+# Configured from STORY_FONT_PATHS by init_worker in render workers
+fonts = FontRegistry()
+
+
+@dataclass(frozen=True)
+class TextLine:
+    """One line of overlay text.
+
+    formats are (required fields, format string) pairs tried in order; the
+    first one whose fields are all set is drawn, and the line is skipped
+    if none is. position is the anchor point of the text (see Pillow's
+    text anchors). banner is the (top, bottom) of a full-width band drawn
+    behind the text.
+    """
+    formats: Tuple[Tuple[Tuple[str, ...], str], ...]
+    font_size: int
+    position: Tuple[int, int]
+    anchor: str
+    fill: Color = (255, 255, 255)
+    outline: int = 0
+    outline_fill: Color = (0, 0, 0)
+    banner: Optional[Tuple[int, int]] = None
+    banner_fill: Color = (0, 0, 0)
+
+    def text(self, values: Dict[str, Optional[str]]) -> Optional[str]:
+        for fields, template in self.formats:
+            if all(values.get(field) for field in fields):
+                return template.format(**values)
+        return None
+
+
+@dataclass(frozen=True)
+class StoryTemplate:
+    name: str
+    lines: Tuple[TextLine, ...]
+
+
+TEMPLATES = {template.name: template for template in (
+    # One outlined line with the model name and price near the bottom
+    StoryTemplate("caption", (
+        TextLine(
+            formats=(
+                (("model_name", "price"), "{model_name} - {price}"),
+                (("model_name",), "{model_name}"),
+                (("price",), "Цена: {price}"),
+            ),
+            font_size=80,
+            position=(540, 1800),
+            anchor="ms",
+            outline=2
+        ),
+    )),
+    # Model name on a banner at the top, price on a banner at the bottom
+    StoryTemplate("banners", (
+        TextLine(formats=((("model_name",), "{model_name}"),), font_size=60, position=(540, 120), anchor="ma", banner=(100, 200)),
+        TextLine(formats=((("price",), "Цена: {price}"),), font_size=48, position=(540, 1740), anchor="ma", banner=(1720, 1820)),
+    )),
+)}
+
+# Template each platform's stories are drawn with
+PLATFORM_TEMPLATES = {
+    "vk": "caption",
+    "instagram": "caption",
+    "telegram": "banners",
+}
+
+def init_worker(font_paths: Iterable[str]):
+    """Locate the configured font and load every size the templates use."""
+    fonts.configure(font_paths)
+    for template in TEMPLATES.values():
+        for line in template.lines:
+            fonts.get(line.font_size)
+
+# (box, color, mask) operations that draw a template's text over a story,
+# applied with Image.paste
+Overlay = Tuple[Tuple[tuple, Color, Optional[Image.Image]], ...]
+
+
+def story_crop_box(size: Tuple[int, int]) -> Tuple[float, float, float, float]:
+    """Centered 9:16 box of an image of the given size."""
+    width, height = size
+    target_ratio = STORY_SIZE[0] / STORY_SIZE[1]
+
+    if width / height > target_ratio:
+        # Image is too wide, crop width
+        new_width = height * target_ratio
+        left = (width - new_width) / 2
+        return (left, 0, left + new_width, height)
+    # Image is too tall (or exactly 9:16), crop height
+    new_height = width / target_ratio
+    top = (height - new_height) / 2
+    return (0, top, width, top + new_height)
+
+def open_for_story(image_data: bytes) -> Tuple[Image.Image, Tuple[float, float, float, float]]:
+    """Open a source image and return it with its story crop box.
+
+    JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 scale that still
+    covers the story size, so a 12 MP photo is never fully decoded.
+    """
+    image = Image.open(io.BytesIO(image_data))
+    box = story_crop_box(image.size)
+
+    if image.format == "JPEG":
+        scale = min((box[2] - box[0]) / STORY_SIZE[0], (box[3] - box[1]) / STORY_SIZE[1])
+        if scale >= 2:
+            image.draft("RGB", (math.ceil(image.width / scale), math.ceil(image.height / scale)))
+            box = story_crop_box(image.size)
+    return image, box
+
+def crop_to_story(image: Image.Image, box: Tuple[float, float, float, float]) -> Image.Image:
+    """Crop the box and resize it to the story size in one pass."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image.resize(STORY_SIZE, Image.Resampling.BICUBIC, box=box, reducing_gap=3.0)
+
+def text_mask(text: str, font: ImageFont.FreeTypeFont, anchor: str) -> Tuple[Image.Image, int, int]:
+    """Rasterize text once, returning its mask and offset from the anchor point."""
+    left, top, right, bottom = font.getbbox(text, anchor=anchor)
+    mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor=anchor)
+    return mask, left, top
+
+def outline_mask(mask: Image.Image, width: int) -> Image.Image:
+    """Mask of the text shifted width px diagonally each way, padded by width."""
+    outline = Image.new("L", (mask.width + 2 * width, mask.height + 2 * width))
+    for offset_x, offset_y in [(-width, -width), (-width, width), (width, -width), (width, width)]:
+        shifted = Image.new("L", outline.size)
+        shifted.paste(mask, (width + offset_x, width + offset_y))
+        outline = ImageChops.lighter(outline, shifted)
+    return outline
+
+@lru_cache(maxsize=256)
+def build_overlay(template: str, model_name: Optional[str], price: Optional[str]) -> Overlay:
+    """Measure and rasterize a template's text once per text and worker process."""
+    values = {"model_name": model_name, "price": price}
+    operations = []
+    for line in TEMPLATES[template].lines:
+        text = line.text(values)
+        if not text:
+            continue
+
+        mask, left, top = text_mask(text, fonts.get(line.font_size), line.anchor)
+        x, y = line.position[0] + left, line.position[1] + top
+        if line.banner:
+            operations.append(((0, line.banner[0], STORY_SIZE[0], line.banner[1] + 1), line.banner_fill, None))
+        if line.outline:
+            # Outline first, so the text is readable on any background
+            operations.append(((x - line.outline, y - line.outline), line.outline_fill, outline_mask(mask, line.outline)))
+        operations.append(((x, y), line.fill, mask))
+    return tuple(operations)
+
+def render_story_image(image_data: bytes, model_name: Optional[str], price: Optional[str], template: str) -> bytes:
+    """Render a story JPEG from source image bytes."""
+    image, box = open_for_story(image_data)
+    image = crop_to_story(image, box)
+
+    for box, color, mask in build_overlay(template, model_name, price):
+        image.paste(color, box, mask)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from app.config.settings import STORY_CACHE_DIR, STORY_CACHE_MAX_BYTES, STORY_FONT_PATHS
+from app.utils.media_cache import KeyedLocks, MediaCache, media_cache
+from app.utils.story_image import PLATFORM_TEMPLATES, TEMPLATE_VERSION, fonts, render_story_image
+from app.workers.render_pool import render_pool
+
+logger = logging.getLogger(__name__)
+
+
+class StoryRenderer:
+    """Renders story images once and keeps them in an on-disk cache.
+
+    A render is identified by the source media (its media cache key, which
+    follows the Telegram file_unique_id), the overlay text, the template and
+    its version, the font, and the platform. Publishing the same story
+    again, or retrying a failed publication, reads the cached JPEG instead
+    of downloading and redrawing the photo.
+    """
+
+    def __init__(self, cache: MediaCache):
+        self.cache = cache
+        self._locks = KeyedLocks()
+
+        self.hits = 0
+        self.misses = 0
+
+    def render_key(self, source_key: str, model_name: Optional[str], price: Optional[str], platform: str) -> str:
+        """Cache key of one rendered story."""
+        template = PLATFORM_TEMPLATES[platform]
+        parts = [source_key, model_name or "", price or "", template, TEMPLATE_VERSION, fonts.name, platform]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    async def _read(self, key: str) -> Optional[bytes]:
+        path = self.cache.lookup(key)
+        if path is None:
+            return None
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            # Evicted between lookup and read
+            return None
+
+    async def _write(self, key: str, data: bytes):
+        tmp_path = self.cache.part_path(key, "story.jpg")
+        try:
+            await asyncio.to_thread(tmp_path.write_bytes, data)
+            await self.cache.store(key, tmp_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    async def render(self, file_id: str, model_name: Optional[str], price: Optional[str], platform: str) -> Optional[bytes]:
+        """Return the story JPEG for a Telegram photo, rendering it at most once."""
+        source_key = await media_cache.get_key(file_id)
+        if source_key is None:
+            logger.error(f"Failed to resolve story media {file_id}")
+            return None
+
+        key = self.render_key(source_key, model_name, price, platform)
+        async with self._locks.hold(key):
+            data = await self._read(key)
+            if data is not None:
+                self.hits += 1
+                return data
+
+            self.misses += 1
+            image_data = await media_cache.get_bytes(file_id)
+            if not image_data:
+                logger.error(f"Failed to download story media {file_id}")
+                return None
+
+            try:
+                data = await render_pool.run(
+                    render_story_image, image_data, model_name, price, PLATFORM_TEMPLATES[platform]
+                )
+            except Exception as e:
+                logger.error(f"Error creating story image: {str(e)}")
+                return None
+
+            try:
+                await self._write(key, data)
+            except OSError as e:
+                logger.warning(f"Failed to cache story image: {str(e)}")
+            return data
+
+    def stats(self) -> dict:
+        """Return render counters and cache usage."""
+        cache = self.cache.stats()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "files": cache["files"],
+            "bytes": cache["bytes"],
+            "max_bytes": cache["max_bytes"],
+            "evictions": cache["evictions"],
+            "pool": render_pool.stats(),
+        }
+
+
+# The workers pick the same font; here it is only needed for cache keys
+fonts.configure(STORY_FONT_PATHS)
+
+# Process-wide renderer
+story_renderer = StoryRenderer(MediaCache(STORY_CACHE_DIR, STORY_CACHE_MAX_BYTES))
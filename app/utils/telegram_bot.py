@@ -0,0 +1,90 @@
+import logging
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod, GetUpdates, SendMediaGroup
+from aiohttp import ClientSession
+
+from app.config.settings import (
+    TELEGRAM_BOT_TOKEN, TELEGRAM_BOT_CONNECTION_LIMIT, TELEGRAM_API_URL, TELEGRAM_CHANNEL_IDS, RATE_LIMIT_MAX_RETRIES
+)
+from app.utils.rate_limiter import get_limiter
+from app.utils.resilience import get_breaker, is_transient
+
+logger = logging.getLogger(__name__)
+
+# Chats that get the per-chat limit; private chats with operators only use the bot-wide one
+RATE_LIMITED_CHATS = set(TELEGRAM_CHANNEL_IDS)
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Paces Bot API calls through the shared token buckets.
+
+    Every call takes a token from the bot-wide bucket and, when it targets
+    one of the publishing channels, from that channel's bucket (a media
+    group costs one token per item). Replies to operators in private chats
+    only count towards the bot-wide bucket. A 429 pauses the bucket for the
+    retry_after Telegram sent and the call is retried. Network and server errors count towards the Telegram
+    circuit breaker, which rejects calls while it is open.
+    """
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None and str(chat_id) not in RATE_LIMITED_CHATS:
+            chat_id = None
+        cost = len(method.media) if isinstance(method, SendMediaGroup) else 1
+
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            if chat_id is not None:
+                await get_limiter("telegram_chat", chat_id).acquire(cost)
+            await get_limiter("telegram").acquire()
+
+            breaker = get_breaker("telegram")
+            breaker.check()
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                breaker.record_success()
+                if attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                logger.warning(f"Telegram flood control on {type(method).__name__}, retrying in {e.retry_after}s")
+                get_limiter("telegram_chat" if chat_id is not None else "telegram", chat_id or "default").pause(e.retry_after)
+                continue
+            except Exception as e:
+                if is_transient(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            breaker.record_success()
+            return result
+
+# One Bot (and one HTTP connection pool to the Bot API server) per process
+_bot: Optional[Bot] = None
+
+def get_bot() -> Bot:
+    """Get the shared Bot instance, creating it on first use."""
+    global _bot
+    if _bot is None:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL), limit=TELEGRAM_BOT_CONNECTION_LIMIT)
+        session.middleware(RateLimitMiddleware())
+        _bot = Bot(token=TELEGRAM_BOT_TOKEN, session=session)
+        logger.info("Shared Telegram bot created")
+    return _bot
+
+async def get_http_session() -> ClientSession:
+    """Get the aiohttp session behind the shared Bot, for raw file downloads."""
+    return await get_bot().session.create_session()
+
+async def close_bot():
+    """Close the shared Bot's HTTP session."""
+    if _bot is not None:
+        await _bot.session.close()
+        logger.info("Shared Telegram bot session closed")
@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.api.models.checkpoint import PublicationCheckpoint
+
+logger = logging.getLogger(__name__)
+
+def clear_checkpoints(db: Session, post_id: str):
+    """Forget the recorded steps of a post, e.g. after its text or media changed."""
+    db.query(PublicationCheckpoint).filter(
+        PublicationCheckpoint.post_id == post_id
+    ).delete(synchronize_session=False)
+
+
+class PublicationCheckpoints:
+    """Completed steps of publishing one post to one platform.
+
+    Publishers record each step as soon as it succeeds (an uploaded photo,
+    the wall post, a sent message batch) and skip recorded steps when the
+    publication is retried, so a failure halfway through doesn't upload
+    everything again or publish a duplicate. Every step is committed in its
+    own session so it survives errors in the publisher's session.
+    """
+
+    def __init__(self, post_id: str, platform: str):
+        self.post_id = post_id
+        self.platform = platform
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self.load()
+
+    def load(self):
+        """Read the recorded steps from the database."""
+        db = SessionLocal()
+        try:
+            rows = db.query(PublicationCheckpoint).filter(
+                PublicationCheckpoint.post_id == self.post_id,
+                PublicationCheckpoint.platform == self.platform
+            ).all()
+            self._values = {(row.step, row.item): row.value for row in rows}
+        finally:
+            db.close()
+
+        if self._values:
+            logger.info(f"Resuming {self.platform} publication of post {self.post_id} from {len(self._values)} checkpoints")
+
+    def get(self, step: str, item: str = "") -> Any:
+        """Return the recorded result of a step, or None if it hasn't completed."""
+        return self._values.get((step, item))
+
+    def save(self, step: str, item: str, value: Any):
+        """Record a completed step."""
+        db = SessionLocal()
+        try:
+            checkpoint = db.query(PublicationCheckpoint).filter(
+                PublicationCheckpoint.post_id == self.post_id,
+                PublicationCheckpoint.platform == self.platform,
+                PublicationCheckpoint.step == step,
+                PublicationCheckpoint.item == item
+            ).first()
+
+            if checkpoint is None:
+                checkpoint = PublicationCheckpoint(post_id=self.post_id, platform=self.platform, step=step, item=item)
+                db.add(checkpoint)
+            checkpoint.value = value
+            db.commit()
+        except Exception as e:
+            # Losing a checkpoint only costs a repeated step on retry
+            db.rollback()
+            logger.error(f"Error saving {self.platform} checkpoint {step}/{item} for post {self.post_id}: {str(e)}")
+        finally:
+            db.close()
+
+        self._values[(step, item)] = value
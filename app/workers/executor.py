@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config.settings import PLATFORM_EXECUTOR_WORKERS, PLATFORM_SLOW_CALL_SECONDS
+from app.utils.resilience import get_breaker, is_transient
+
+logger = logging.getLogger(__name__)
+
+
+class PlatformExecutor:
+    """Thread pool for the blocking SDK calls of one platform.
+
+    vk_api, instagrapi and requests are synchronous, so publishers await
+    them here instead of calling them on the event loop shared by the bot
+    and the API. Each platform gets its own pool so a slow Instagram upload
+    cannot starve VK calls.
+    """
+
+    def __init__(self, platform: str, max_workers: int):
+        self.platform = platform
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{platform}-sdk")
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.errors = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.slow_calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def _call(self, submitted_at: float, func: Callable, *args, **kwargs):
+        """Run func in a pool thread and record timings."""
+        started_at = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.total_wait_seconds += started_at - submitted_at
+
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started_at
+            slow = elapsed >= PLATFORM_SLOW_CALL_SECONDS
+            with self._lock:
+                self.in_flight -= 1
+                self.calls += 1
+                self.errors += failed
+                self.slow_calls += slow
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+            if slow:
+                name = getattr(func, "__qualname__", repr(func))
+                logger.warning(f"Slow {self.platform} call {name}: {elapsed:.1f}s")
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function in this platform's pool and await the result."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.queued += 1
+        call = functools.partial(self._call, time.monotonic(), func, *args, **kwargs)
+        return await loop.run_in_executor(self._pool, call)
+
+    def stats(self) -> dict:
+        """Return executor counters."""
+        return {
+            "workers": self.max_workers,
+            "calls": self.calls,
+            "errors": self.errors,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "slow_calls": self.slow_calls,
+            "avg_seconds": round(self.total_seconds / self.calls, 3) if self.calls else 0.0,
+            "max_seconds": round(self.max_seconds, 3),
+            "avg_wait_seconds": round(self.total_wait_seconds / self.calls, 3) if self.calls else 0.0,
+        }
+
+    def shutdown(self):
+        """Stop accepting work; running calls finish in the background."""
+        self._pool.shutdown(wait=False)
+
+
+_executors: Dict[str, PlatformExecutor] = {}
+
+def get_executor(platform: str) -> PlatformExecutor:
+    """Get the executor for a platform, creating it on first use."""
+    executor = _executors.get(platform)
+    if executor is None:
+        max_workers = PLATFORM_EXECUTOR_WORKERS.get(platform, PLATFORM_EXECUTOR_WORKERS["default"])
+        executor = _executors[platform] = PlatformExecutor(platform, max_workers)
+    return executor
+
+async def run_blocking(platform: str, func: Callable, *args, **kwargs) -> Any:
+    """Await a blocking platform SDK call without stalling the event loop.
+
+    Calls fail fast with CircuitOpenError while the platform's circuit
+    breaker is open.
+    """
+    breaker = get_breaker(platform)
+    breaker.check()
+    try:
+        result = await get_executor(platform).run(func, *args, **kwargs)
+    except Exception as e:
+        if is_transient(e):
+            breaker.record_failure()
+        else:
+            # The platform answered, the request itself was rejected
+            breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+def executor_stats() -> dict:
+    """Return counters for all platform executors."""
+    return {platform: executor.stats() for platform, executor in _executors.items()}
+
+def shutdown_executors():
+    """Shut down all platform executors."""
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
@@ -0,0 +1,54 @@
+import logging
+
+from instagrapi import Client
+from instagrapi.exceptions import ClientThrottledError, PleaseWaitFewMinutes, RateLimitError
+
+from app.config.settings import RATE_LIMIT_MAX_RETRIES, INSTAGRAM_THROTTLE_PAUSE, INSTAGRAM_USERNAME, INSTAGRAM_API_URL
+from app.utils.base_url import redirect_session
+from app.utils.rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_ERRORS = (ClientThrottledError, PleaseWaitFewMinutes, RateLimitError)
+
+def get_retry_after(error: Exception) -> float:
+    """Read the Retry-After header of a throttling response, if Instagram sent one."""
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return INSTAGRAM_THROTTLE_PAUSE
+
+
+class RateLimitedClient(Client):
+    """instagrapi Client whose API requests go through the shared Instagram token bucket.
+
+    Throttling errors pause the bucket for the account (using Retry-After when
+    present) and the request is retried.
+    """
+
+    def __init__(self, *args, account: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = get_limiter("instagram", account or INSTAGRAM_USERNAME or "default")
+        if INSTAGRAM_API_URL:
+            redirect_session(self.private, INSTAGRAM_API_URL, "https://i.instagram.com/", "https://b.i.instagram.com/")
+            redirect_session(self.public, INSTAGRAM_API_URL, "https://www.instagram.com/")
+
+    def _limited(self, request, *args, **kwargs):
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            self.limiter.acquire_sync()
+            try:
+                return request(*args, **kwargs)
+            except THROTTLE_ERRORS as e:
+                if attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                delay = get_retry_after(e)
+                logger.warning(f"Instagram throttled the request ({type(e).__name__}), retrying in {delay}s")
+                self.limiter.pause(delay)
+
+    def private_request(self, *args, **kwargs):
+        return self._limited(super().private_request, *args, **kwargs)
+
+    def public_request(self, *args, **kwargs):
+        return self._limited(super().public_request, *args, **kwargs)
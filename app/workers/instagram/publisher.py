@@ -1,78 +1,108 @@
 import os
+import json
+import time
 import logging
 import asyncio
-import ssl
+from pathlib import Path
 from datetime import datetime, timezone
-import aiohttp
-import json
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from instagrapi import Client
 
 from app.db.database import SessionLocal
+from app.workers.instagram.session import instagram_session
 from app.api.models.post import Post, PublicationLog
-from app.config.settings import MEDIA_DIR
+from app.workers.prefetch import ensure_post_media
+from app.workers.checkpoints import PublicationCheckpoints
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Получение данных из переменных окружения
-INSTAGRAM_USERNAME = os.getenv("INSTAGRAM_USERNAME", "")
-INSTAGRAM_PASSWORD = os.getenv("INSTAGRAM_PASSWORD", "")
-INSTAGRAM_SESSION_PATH = os.getenv("INSTAGRAM_SESSION_PATH", "instagram_session.json")
+# Загруженные, но не опубликованные фото используются повторно не дольше этого времени
+UPLOAD_REUSE_SECONDS = 3600
+
+# Попытки подтверждения карусели, пока Instagram обрабатывает фото
+ALBUM_CONFIGURE_ATTEMPTS = 10
+ALBUM_CONFIGURE_DELAY = 3
 
 class InstagramPublisher:
     """Класс для публикации постов в Instagram."""
 
     def __init__(self):
-        """Инициализация клиента Instagram."""
-        self.client = Client()
+        """Инициализация публикатора; клиент Instagram общий для процесса."""
+        self.client = None
         self.is_logged_in = False
 
     async def login(self) -> bool:
-        """Авторизация в Instagram."""
+        """Получение общего авторизованного клиента Instagram."""
         try:
-            # Проверяем наличие сохраненной сессии
-            if os.path.exists(INSTAGRAM_SESSION_PATH):
-                try:
-                    # Загружаем сессию из файла
-                    with open(INSTAGRAM_SESSION_PATH, 'r') as f:
-                        session_data = json.load(f)
-
-                    # Устанавливаем сессию
-                    self.client.set_settings(session_data)
-
-                    # Проверяем валидность сессии
-                    self.client.get_timeline_feed()
-                    self.is_logged_in = True
-                    logger.info("Успешно восстановлена сессия Instagram")
-                    return True
-                except Exception as e:
-                    logger.warning(f"Не удалось восстановить сессию Instagram: {str(e)}")
-
-            # Если сессия не найдена или недействительна, выполняем вход
-            if not self.is_logged_in:
-                if not INSTAGRAM_USERNAME or not INSTAGRAM_PASSWORD:
-                    logger.error("Отсутствуют учетные данные Instagram")
-                    return False
-
-                # Выполняем вход
-                self.client.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-
-                # Сохраняем сессию
-                session_data = self.client.get_settings()
-                with open(INSTAGRAM_SESSION_PATH, 'w') as f:
-                    json.dump(session_data, f)
-
-                self.is_logged_in = True
-                logger.info("Успешная авторизация в Instagram")
-                return True
-
+            self.client = await instagram_session.get_client()
+            self.is_logged_in = True
+            return True
         except Exception as e:
             logger.error(f"Ошибка при авторизации в Instagram: {str(e)}")
             return False
 
+    async def publish_once(self, checkpoints: PublicationCheckpoints, key: str, upload, *args) -> Optional[str]:
+        """Публикация медиа, если она не была выполнена предыдущей попыткой. Возвращает ID медиа."""
+        media_pk = checkpoints.get("media", key)
+        if media_pk:
+            logger.info(f"Медиа {key} уже опубликовано ранее ({media_pk}), пропускаем")
+            return media_pk
+
+        media = await instagram_session.run(upload, *args)
+        media_pk = str(media.pk)
+        checkpoints.save("media", key, media_pk)
+        return media_pk
+
+    async def upload_album(self, checkpoints: PublicationCheckpoints, photos: List[Tuple[str, str]], caption: str) -> Optional[str]:
+        """Публикация карусели из фото с сохранением каждой загрузки.
+
+        Фото, загруженные предыдущей попыткой, повторно не загружаются:
+        карусель собирается из их upload_id.
+        """
+        media_pk = checkpoints.get("media", "album")
+        if media_pk:
+            logger.info(f"Карусель уже опубликована ранее ({media_pk}), пропускаем")
+            return media_pk
+
+        children = []
+        for file_id, path in photos:
+            uploaded = checkpoints.get("upload", file_id)
+            if not uploaded or time.time() - uploaded["uploaded_at"] > UPLOAD_REUSE_SECONDS:
+                upload_id, width, height = await instagram_session.run(self.client.photo_rupload, Path(path), "", True)
+                uploaded = {"upload_id": upload_id, "width": width, "height": height, "uploaded_at": time.time()}
+                checkpoints.save("upload", file_id, uploaded)
+            else:
+                logger.info(f"Фото {file_id} уже загружено ранее ({uploaded['upload_id']})")
+
+            width, height = uploaded["width"], uploaded["height"]
+            children.append({
+                "upload_id": uploaded["upload_id"],
+                "edits": json.dumps({"crop_original_size": [width, height], "crop_center": [0.0, -0.0], "crop_zoom": 1.0}),
+                "extra": json.dumps({"source_width": width, "source_height": height}),
+                "scene_capture_type": "",
+                "scene_type": None
+            })
+
+        # Instagram может ещё обрабатывать загруженные фото
+        for attempt in range(ALBUM_CONFIGURE_ATTEMPTS):
+            await asyncio.sleep(ALBUM_CONFIGURE_DELAY)
+            try:
+                configured = await instagram_session.run(self.client.album_configure, children, caption)
+            except Exception as e:
+                if "Transcode not finished yet" in str(e):
+                    continue
+                raise
+            if configured:
+                break
+        else:
+            raise Exception("Instagram не подтвердил публикацию карусели")
+
+        media_pk = str((configured.get("media") or {}).get("pk", ""))
+        checkpoints.save("media", "album", media_pk)
+        return media_pk
+
     async def publish_post(self, post_id: str) -> bool:
         """Публикация поста в Instagram."""
         # Получаем сессию базы данных
@@ -104,40 +134,16 @@ class InstagramPublisher:
                 db.commit()
                 return False
 
-            # Получаем путь к директории с медиафайлами поста
-            post_dir = MEDIA_DIR / post.storage_path
-
             # Получаем текст поста
             caption = post.text
 
-            # Загружаем медиафайлы
-            media_paths = []
-
-            # Загружаем фотографии из Telegram
-            photos = post.photos
-            videos = post.videos
-
-            # Если есть фотографии или видео, загружаем их
-            if photos or videos:
-                # Загружаем фотографии
-                for i, photo_id in enumerate(photos):
-                    photo_path = post_dir / f"photo_{i}.jpg"
-                    if not os.path.exists(photo_path):
-                        # Если файл не существует, скачиваем его
-                        await self._download_telegram_file(photo_id, photo_path)
+            # Получаем медиафайлы, заранее скачанные в директорию поста
+            media_files = await ensure_post_media(post.id)
+            media_paths = [str(path) for _, _, path in media_files if path is not None]
+            file_ids = {str(path): file_id for _, file_id, path in media_files if path is not None}
 
-                    if os.path.exists(photo_path):
-                        media_paths.append(str(photo_path))
-
-                # Загружаем видео
-                for i, video_id in enumerate(videos):
-                    video_path = post_dir / f"video_{i}.mp4"
-                    if not os.path.exists(video_path):
-                        # Если файл не существует, скачиваем его
-                        await self._download_telegram_file(video_id, video_path)
-
-                    if os.path.exists(video_path):
-                        media_paths.append(str(video_path))
+            # Шаги, выполненные предыдущими попытками публикации
+            checkpoints = PublicationCheckpoints(post.id, "instagram")
 
             # Публикуем пост в Instagram
             try:
@@ -163,17 +169,17 @@ class InstagramPublisher:
                     try:
                         if media_path.endswith(('.jpg', '.jpeg', '.png')):
                             # Публикуем фото
-                            self.client.photo_upload(media_path, caption)
+                            await self.publish_once(checkpoints, file_ids[media_path], self.client.photo_upload, media_path, caption)
                         elif media_path.endswith(('.mp4', '.mov')):
                             # Публикуем видео
                             try:
                                 # Пробуем использовать video_upload
-                                self.client.video_upload(media_path, caption)
+                                await self.publish_once(checkpoints, file_ids[media_path], self.client.video_upload, media_path, caption)
                             except Exception as e:
                                 if "Please install moviepy" in str(e):
                                     # Если ошибка связана с moviepy, используем альтернативный метод
                                     logger.warning(f"Ошибка при загрузке видео через video_upload: {str(e)}. Пробуем clip_upload.")
-                                    self.client.clip_upload(media_path, caption)
+                                    await self.publish_once(checkpoints, file_ids[media_path], self.client.clip_upload, media_path, caption)
                                 else:
                                     # Если другая ошибка, пробрасываем её дальше
                                     raise
@@ -232,17 +238,17 @@ class InstagramPublisher:
 
                                     if len(photo_paths) == 1:
                                         # Если одно фото, публикуем как одиночный пост
-                                        self.client.photo_upload(photo_paths[0], caption)
+                                        await self.publish_once(checkpoints, file_ids[photo_paths[0]], self.client.photo_upload, photo_paths[0], caption)
                                     else:
                                         # Если несколько фото, публикуем как карусель
-                                        self.client.album_upload(photo_paths, caption)
+                                        await self.upload_album(checkpoints, [(file_ids[path], path) for path in photo_paths], caption)
 
                                     # Затем пробуем загрузить видео отдельно
                                     for video_path in video_paths:
                                         try:
                                             logger.info(f"Пробуем загрузить видео отдельно: {video_path}")
                                             # Пробуем использовать clip_upload вместо video_upload
-                                            self.client.clip_upload(video_path, caption)
+                                            await self.publish_once(checkpoints, file_ids[video_path], self.client.clip_upload, video_path, caption)
                                             logger.info(f"Видео успешно загружено: {video_path}")
                                         except Exception as video_error:
                                             logger.error(f"Ошибка при загрузке видео {video_path}: {str(video_error)}")
@@ -252,14 +258,14 @@ class InstagramPublisher:
                                         try:
                                             logger.info(f"Пост содержит только видео. Пробуем загрузить первое видео.")
                                             # Пробуем использовать clip_upload вместо video_upload
-                                            self.client.clip_upload(video_paths[0], caption)
+                                            await self.publish_once(checkpoints, file_ids[video_paths[0]], self.client.clip_upload, video_paths[0], caption)
                                             logger.info(f"Видео успешно загружено: {video_paths[0]}")
                                         except Exception as video_error:
                                             logger.error(f"Ошибка при загрузке видео {video_paths[0]}: {str(video_error)}")
                                             raise
                             else:
                                 # Если нет видео, загружаем все файлы как карусель
-                                self.client.album_upload(valid_paths, caption)
+                                await self.upload_album(checkpoints, [(file_ids[path], path) for path in valid_paths], caption)
                         except Exception as e:
                             if "Please install moviepy" in str(e) and photo_paths:
                                 # Если ошибка связана с moviepy и есть фотографии, публикуем только фото
@@ -267,10 +273,10 @@ class InstagramPublisher:
 
                                 if len(photo_paths) == 1:
                                     # Если одно фото, публикуем как одиночный пост
-                                    self.client.photo_upload(photo_paths[0], caption)
+                                    await self.publish_once(checkpoints, file_ids[photo_paths[0]], self.client.photo_upload, photo_paths[0], caption)
                                 else:
                                     # Если несколько фото, публикуем как карусель
-                                    self.client.album_upload(photo_paths, caption)
+                                    await self.upload_album(checkpoints, [(file_ids[path], path) for path in photo_paths], caption)
                             else:
                                 # Если другая ошибка, пробрасываем её дальше
                                 raise
@@ -337,65 +343,6 @@ class InstagramPublisher:
         finally:
             db.close()
 
-    async def _download_telegram_file(self, file_id: str, save_path: str) -> bool:
-        """Скачивание файла из Telegram."""
-        try:
-            # Получаем токен бота из переменных окружения
-            bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "")
-
-            if not bot_token:
-                logger.error("Отсутствует токен бота Telegram")
-                return False
-
-            # Создаем SSL-контекст, который игнорирует проверку сертификатов
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            # Получаем информацию о файле
-            file_url = f"https://api.telegram.org/bot{bot_token}/getFile?file_id={file_id}"
-
-            # Используем SSL-контекст при создании сессии
-            conn = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=conn) as session:
-                async with session.get(file_url) as response:
-                    if response.status != 200:
-                        logger.error(f"Ошибка при получении информации о файле: {response.status}")
-                        return False
-
-                    data = await response.json()
-
-                    if not data.get("ok"):
-                        logger.error(f"Ошибка API Telegram: {data.get('description')}")
-                        return False
-
-                    file_path = data.get("result", {}).get("file_path")
-
-                    if not file_path:
-                        logger.error("Не удалось получить путь к файлу")
-                        return False
-
-                    # Скачиваем файл
-                    download_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-
-                    # Создаем директорию для сохранения файла, если она не существует
-                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-
-                    async with session.get(download_url) as file_response:
-                        if file_response.status != 200:
-                            logger.error(f"Ошибка при скачивании файла: {file_response.status}")
-                            return False
-
-                        with open(save_path, 'wb') as f:
-                            f.write(await file_response.read())
-
-                        logger.info(f"Файл успешно скачан и сохранен: {save_path}")
-                        return True
-
-        except Exception as e:
-            logger.error(f"Ошибка при скачивании файла из Telegram: {str(e)}")
-            return False
-
 # Функция для публикации поста в Instagram
 async def publish_post_to_instagram(post_id: str) -> bool:
     """Публикация поста в Instagram."""
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+
+from instagrapi.exceptions import BadCredentials, LoginRequired
+
+from app.config.settings import INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, INSTAGRAM_SESSION_PATH
+from app.workers.executor import run_blocking
+from app.workers.instagram.client import RateLimitedClient
+
+logger = logging.getLogger(__name__)
+
+
+class InstagramSession:
+    """Process-wide logged-in Instagram client shared by post and story publishers.
+
+    A saved session is loaded without a validation request; the first real
+    call validates it, and the client logs in again only when Instagram
+    answers with LoginRequired. Calls on the shared client are serialized
+    because instagrapi keeps per-request state on the client.
+    """
+
+    def __init__(self, username: str, password: str, session_path: str):
+        self.username = username
+        self.password = password
+        self.session_path = session_path
+        self._client: Optional[RateLimitedClient] = None
+        self._client_lock = asyncio.Lock()
+        self._call_lock = asyncio.Lock()
+        self._saved_settings: Optional[str] = None
+
+    def _save(self, client: RateLimitedClient):
+        """Write the session to disk atomically if it changed since the last save."""
+        settings = json.dumps(client.get_settings())
+        if settings == self._saved_settings:
+            return
+
+        tmp_path = f"{self.session_path}.part"
+        with open(tmp_path, "w") as f:
+            f.write(settings)
+        os.replace(tmp_path, self.session_path)
+        self._saved_settings = settings
+
+    def _login(self, client: RateLimitedClient, relogin: bool = False):
+        """Log in with the configured credentials and save the session (blocking)."""
+        if not self.username or not self.password:
+            raise BadCredentials("Отсутствуют учетные данные Instagram")
+
+        client.relogin_attempt = 0
+        client.login(self.username, self.password, relogin=relogin)
+        self._save(client)
+        logger.info("Успешная авторизация в Instagram")
+
+    def _create_client(self) -> RateLimitedClient:
+        """Create a client from the saved session, logging in only if there is none (blocking)."""
+        client = RateLimitedClient(account=self.username)
+        client.username = self.username
+        client.password = self.password
+
+        if os.path.exists(self.session_path):
+            try:
+                with open(self.session_path, "r") as f:
+                    self._saved_settings = f.read()
+                client.set_settings(json.loads(self._saved_settings))
+                logger.info("Сессия Instagram загружена, проверка при первом запросе")
+                return client
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить сессию Instagram: {str(e)}")
+
+        self._login(client)
+        return client
+
+    async def get_client(self) -> RateLimitedClient:
+        """Get the shared client, creating it on first use."""
+        async with self._client_lock:
+            if self._client is None:
+                self._client = await run_blocking("instagram", self._create_client)
+            return self._client
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking client method, logging in again once if the session expired."""
+        client = await self.get_client()
+        async with self._call_lock:
+            try:
+                result = await run_blocking("instagram", func, *args, **kwargs)
+            except LoginRequired:
+                logger.warning("Сессия Instagram истекла, выполняем повторный вход")
+                await run_blocking("instagram", self._login, client, True)
+                result = await run_blocking("instagram", func, *args, **kwargs)
+
+            # Keep refreshed cookies on disk; serializing and writing happen in
+            # a worker thread, outside run_blocking, which would count the
+            # local write as an Instagram call in the circuit breaker
+            try:
+                await asyncio.to_thread(self._save, client)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить сессию Instagram: {str(e)}")
+            return result
+
+
+# Process-wide Instagram session
+instagram_session = InstagramSession(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, INSTAGRAM_SESSION_PATH)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import MEDIA_DIR, MEDIA_PREFETCH_CONCURRENCY
+from app.db.database import SessionLocal
+from app.api.models.post import Post
+from app.utils.media_cache import media_cache
+
+logger = logging.getLogger(__name__)
+
+# Maps local file names in the post directory to the file_ids they hold
+MANIFEST_NAME = "media_files.json"
+
+# Limits concurrent downloads across all posts
+_semaphore = asyncio.Semaphore(MEDIA_PREFETCH_CONCURRENCY)
+
+# Running prefetch task per post
+_tasks: Dict[str, asyncio.Task] = {}
+
+def get_post_media_files(post) -> List[Tuple[str, str, str]]:
+    """Return (kind, file_id, file name) for every media item of a post, in order."""
+    files = [("photo", file_id, f"photo_{i}.jpg") for i, file_id in enumerate(post.photos or [])]
+    files += [("video", file_id, f"video_{i}.mp4") for i, file_id in enumerate(post.videos or [])]
+    return files
+
+def _read_manifest(post_dir: Path) -> dict:
+    try:
+        with open(post_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _write_manifest(post_dir: Path, manifest: dict):
+    tmp_path = post_dir / f"{MANIFEST_NAME}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, post_dir / MANIFEST_NAME)
+
+async def _fetch(file_id: str, path: Path) -> Optional[Path]:
+    async with _semaphore:
+        if await media_cache.copy_to(file_id, path):
+            return path
+    logger.error(f"Failed to prefetch {file_id} to {path}")
+    return None
+
+async def _prefetch(post_id: str) -> List[Tuple[str, str, Optional[Path]]]:
+    """Download all media of a post into its storage directory."""
+    db = SessionLocal()
+    try:
+        post = db.query(Post).filter(Post.id == post_id).first()
+        if not post:
+            logger.error(f"Post {post_id} not found")
+            return []
+        files = get_post_media_files(post)
+        storage_path = post.storage_path
+    finally:
+        db.close()
+
+    if not storage_path:
+        # Nothing to store locally, serve straight from the cache
+        paths = await asyncio.gather(*(media_cache.get_path(file_id) for _, file_id, _ in files))
+        return [(kind, file_id, path) for (kind, file_id, _), path in zip(files, paths)]
+
+    post_dir = MEDIA_DIR / storage_path
+    post_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(post_dir)
+
+    # Remove files left over from a previous version of the post
+    expected = {name for _, _, name in files}
+    for name in list(manifest):
+        if name not in expected:
+            manifest.pop(name)
+            try:
+                (post_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    async def fetch(file_id, name):
+        path = post_dir / name
+        if manifest.get(name) == file_id and path.exists():
+            return path
+        result = await _fetch(file_id, path)
+        if result is not None:
+            manifest[name] = file_id
+        return result
+
+    paths = await asyncio.gather(*(fetch(file_id, name) for _, file_id, name in files))
+    _write_manifest(post_dir, manifest)
+
+    fetched = sum(1 for path in paths if path is not None)
+    logger.info(f"Prefetched {fetched}/{len(files)} media files for post {post_id}")
+    return [(kind, file_id, path) for (kind, file_id, _), path in zip(files, paths)]
+
+async def _run(post_id: str, previous: Optional[asyncio.Task]):
+    # Wait for an earlier prefetch of the same post so they don't race on the manifest
+    if previous is not None and not previous.done():
+        # wait() returns however the earlier task ends, even if it was cancelled,
+        # and only raises if this task itself is cancelled
+        await asyncio.wait([previous])
+    return await _prefetch(post_id)
+
+def schedule_prefetch(post_id: str) -> asyncio.Task:
+    """Start downloading a post's media in the background."""
+    task = asyncio.create_task(_run(post_id, _tasks.get(post_id)))
+    _tasks[post_id] = task
+
+    def done(t):
+        if _tasks.get(post_id) is t:
+            _tasks.pop(post_id, None)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"Error prefetching media for post {post_id}: {str(t.exception())}")
+
+    task.add_done_callback(done)
+    return task
+
+async def prefetch_post_media(post_id: str):
+    """Prefetch a post's media; used as a FastAPI background task."""
+    try:
+        await asyncio.shield(schedule_prefetch(post_id))
+    except Exception:
+        # Already logged by the task callback
+        pass
+
+async def ensure_post_media(post_id: str) -> List[Tuple[str, str, Optional[Path]]]:
+    """Return local paths of a post's media, waiting for or finishing the prefetch.
+
+    Returns (kind, file_id, path) tuples in the order the user added them;
+    path is None for items that could not be downloaded. The prefetch is
+    shared with other callers, so cancelling this one leaves it running.
+    """
+    return await asyncio.shield(schedule_prefetch(post_id))
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config.settings import JOB_WORKERS, JOB_POLL_INTERVAL, JOB_LEASE_TIMEOUT, PUBLISH_MAX_ATTEMPTS
+from app.db.database import SessionLocal, engine
+from app.api.models.job import PublicationJob
+from app.utils.resilience import CircuitOpenError, backoff_delay, get_breaker, track_failures
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def get_publisher(kind: str, platform: str) -> Callable[[str], Awaitable[bool]]:
+    """Get the worker function that publishes a post or story to a platform."""
+    if kind == "post":
+        if platform == "vk":
+            from app.workers.vk.publisher import publish_post_to_vk
+            return publish_post_to_vk
+        elif platform == "telegram":
+            from app.workers.telegram.publisher import publish_post_to_telegram
+            return publish_post_to_telegram
+        elif platform == "instagram":
+            from app.workers.instagram.publisher import publish_post_to_instagram
+            return publish_post_to_instagram
+    elif kind == "story":
+        if platform == "vk":
+            from app.workers.vk.story_publisher import publish_story_to_vk
+            return publish_story_to_vk
+        elif platform == "telegram":
+            from app.workers.telegram.story_publisher import publish_story_to_telegram
+            return publish_story_to_telegram
+        elif platform == "instagram":
+            from app.workers.instagram.story_publisher import publish_story_to_instagram
+            return publish_story_to_instagram
+
+    raise ValueError(f"Unsupported job: {kind} to {platform}")
+
+async def run_publisher(kind: str, target_id: str, platform: str) -> bool:
+    """Publish a post or story to a platform, retrying after transient failures.
+
+    An attempt is retried with jittered exponential backoff only if its own
+    platform calls hit network or server errors; other failures (missing
+    post, rejected media) are final, whatever concurrent jobs run into. Publishers
+    resume from their checkpoints, so a retry doesn't repeat finished steps.
+    Raises CircuitOpenError without calling the publisher while the
+    platform is down.
+    """
+    publisher = get_publisher(kind, platform)
+    breaker = get_breaker(platform)
+
+    for attempt in range(PUBLISH_MAX_ATTEMPTS):
+        breaker.check(probe=False)
+        with track_failures() as failures:
+            if await publisher(target_id):
+                return True
+
+        if not failures or attempt == PUBLISH_MAX_ATTEMPTS - 1:
+            break
+        delay = backoff_delay(attempt)
+        logger.warning(f"Publishing {kind} {target_id} to {platform} failed with transient errors, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    return False
+
+def enqueue_publication(db: Session, kind: str, target_id: str, platform: str) -> PublicationJob:
+    """Queue a publication, reusing an active job for the same target and platform."""
+    job = db.query(PublicationJob).filter(
+        PublicationJob.kind == kind,
+        PublicationJob.target_id == target_id,
+        PublicationJob.platform == platform,
+        PublicationJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+
+    if job is None:
+        job = PublicationJob(kind=kind, target_id=target_id, platform=platform, status="queued")
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Queued job {job.id}: {kind} {target_id} to {platform}")
+
+    publication_workers.notify()
+    return job
+
+def claim_job(db: Session, worker_id: str) -> Optional[PublicationJob]:
+    """Atomically take the longest-waiting queued job.
+
+    PostgreSQL uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers
+    never wait on each other. SQLite has no row locks, so the claim is a
+    conditional UPDATE that only one worker can win.
+    """
+    # Released scheduled jobs go in order of their due time
+    query = db.query(PublicationJob).filter(PublicationJob.status == "queued").order_by(
+        func.coalesce(PublicationJob.publish_at, PublicationJob.created_at)
+    )
+    if engine.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    job = query.first()
+    if job is None:
+        db.rollback()
+        return None
+
+    claimed = db.query(PublicationJob).filter(
+        PublicationJob.id == job.id,
+        PublicationJob.status == "queued"
+    ).update({
+        PublicationJob.status: "running",
+        PublicationJob.locked_by: worker_id,
+        PublicationJob.started_at: datetime.utcnow(),
+        PublicationJob.heartbeat_at: datetime.utcnow(),
+        PublicationJob.attempts: PublicationJob.attempts + 1,
+    }, synchronize_session=False)
+    db.commit()
+
+    if not claimed:
+        # Another worker won the race
+        return None
+
+    db.refresh(job)
+    return job
+
+def finish_job(job_id: str, success: bool, error: Optional[str] = None):
+    """Record the outcome of a job."""
+    db = SessionLocal()
+    try:
+        job = db.query(PublicationJob).filter(PublicationJob.id == job_id).first()
+        if job is None:
+            return
+        job.status = "done" if success else "error"
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+def postpone_job(job_id: str, delay: float, reason: str):
+    """Turn a job back into a scheduled one due after a delay, e.g. while its platform is down."""
+    from app.workers.scheduler import publication_scheduler
+
+    publish_at = datetime.utcnow() + timedelta(seconds=delay)
+    db = SessionLocal()
+    try:
+        db.query(PublicationJob).filter(PublicationJob.id == job_id).update({
+            PublicationJob.status: "scheduled",
+            PublicationJob.publish_at: publish_at,
+            PublicationJob.locked_by: None,
+            PublicationJob.error: reason,
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    publication_scheduler.add(job_id, publish_at)
+
+def renew_lease(job_id: str, worker_id: str):
+    """Record that a worker is still running a job."""
+    db = SessionLocal()
+    try:
+        db.query(PublicationJob).filter(
+            PublicationJob.id == job_id,
+            PublicationJob.locked_by == worker_id,
+            PublicationJob.status == "running"
+        ).update({PublicationJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def requeue_expired_jobs(lease_timeout: float) -> int:
+    """Put running jobs whose worker stopped renewing its lease back in the queue.
+
+    Jobs running in another live process (the bot and the API both run a
+    worker pool) keep renewing their leases and are left alone.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_timeout)
+    db = SessionLocal()
+    try:
+        count = db.query(PublicationJob).filter(
+            PublicationJob.status == "running",
+            func.coalesce(PublicationJob.heartbeat_at, PublicationJob.started_at) < cutoff
+        ).update({
+            PublicationJob.status: "queued",
+            PublicationJob.locked_by: None,
+        }, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+class PublicationWorkerPool:
+    """Async workers that drain the publication_jobs table.
+
+    Several processes may run a pool on the same database. A worker renews
+    the lease of the job it runs every lease_timeout / 4 seconds, and every
+    pool re-queues jobs whose lease expired, e.g. because their process was
+    stopped mid-upload.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, lease_timeout: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self):
+        """Wake idle workers after a job was queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        """Start the workers."""
+        if self._tasks or self.concurrency <= 0:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._reclaim()))
+        for i in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self.worker_prefix}:{i}")))
+        logger.info(f"Started {self.concurrency} publication workers")
+
+    async def stop(self):
+        """Stop the workers. Interrupted jobs are re-queued once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _reclaim(self):
+        """Re-queue jobs with expired leases, at startup and periodically."""
+        while True:
+            try:
+                requeued = requeue_expired_jobs(self.lease_timeout)
+                if requeued:
+                    logger.info(f"Re-queued {requeued} interrupted publication jobs")
+                    self.notify()
+            except Exception as e:
+                logger.error(f"Error re-queueing interrupted publication jobs: {str(e)}")
+            await asyncio.sleep(self.lease_timeout / 2)
+
+    async def _heartbeat(self, job_id: str, worker_id: str):
+        while True:
+            await asyncio.sleep(self.lease_timeout / 4)
+            try:
+                renew_lease(job_id, worker_id)
+            except Exception as e:
+                logger.error(f"Error renewing lease of job {job_id}: {str(e)}")
+
+    async def _worker(self, worker_id: str):
+        while True:
+            db = SessionLocal()
+            try:
+                job = claim_job(db, worker_id)
+                if job is not None:
+                    job_id, kind, target_id, platform = job.id, job.kind, job.target_id, job.platform
+            except Exception as e:
+                logger.error(f"Error claiming publication job: {str(e)}")
+                job = None
+            finally:
+                db.close()
+
+            if job is None:
+                await self._wait()
+                continue
+
+            logger.info(f"Worker {worker_id} running job {job_id}: {kind} {target_id} to {platform}")
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+            try:
+                success = await run_publisher(kind, target_id, platform)
+                finish_job(job_id, success, None if success else f"Failed to publish {kind} to {platform}")
+            except asyncio.CancelledError:
+                raise
+            except CircuitOpenError as e:
+                # Don't spend attempts while the platform is down, come back when the breaker probes it
+                logger.warning(f"Postponing job {job_id}: {str(e)}")
+                postpone_job(job_id, e.retry_in + JOB_POLL_INTERVAL, str(e))
+            except Exception as e:
+                logger.error(f"Error running job {job_id}: {str(e)}")
+                finish_job(job_id, False, str(e))
+            finally:
+                heartbeat.cancel()
+
+
+# Process-wide worker pool
+publication_workers = PublicationWorkerPool(JOB_WORKERS, JOB_POLL_INTERVAL, JOB_LEASE_TIMEOUT)
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.config.settings import STORY_RENDER_WORKERS, STORY_RENDER_QUEUE, STORY_FONT_PATHS
+from app.utils.story_image import init_worker
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPool:
+    """Process pool for CPU-heavy image rendering.
+
+    Pillow holds the GIL for most of a decode/resize/encode, so rendering in
+    a thread still slows down the event loop shared by the bot and the API.
+    Renders run in worker processes instead; only bytes and parameters
+    cross the process boundary. At most max_workers + max_queued renders
+    are submitted at once, further callers wait for a slot.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.initializer = initializer
+        self.initargs = initargs
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.renders = 0
+        self.errors = 0
+        self.restarts = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Workers are spawned rather than forked: the parent runs threads
+            # (SDK executors, aiohttp) whose locks a fork could copy mid-use.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs
+            )
+            logger.info(f"Render pool started with {self.max_workers} processes")
+        return self._pool
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a picklable module-level function in a worker process and await the result."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queued)
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        started_at = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._get_pool(), functools.partial(func, *args))
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a new pool for the next render
+                logger.error("Render pool worker died, restarting the pool")
+                self._restart()
+                raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started_at
+            self.in_flight -= 1
+            self.renders += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self._slots.release()
+
+    def _restart(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.restarts += 1
+
+    def stats(self) -> dict:
+        """Return pool counters."""
+        return {
+            "workers": self.max_workers,
+            "max_queued": self.max_queued,
+            "renders": self.renders,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "avg_seconds": round(self.total_seconds / self.renders, 3) if self.renders else 0.0,
+            "max_seconds": round(self.max_seconds, 3),
+        }
+
+    def shutdown(self):
+        """Stop the worker processes; running renders are abandoned."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Process-wide render pool, worker processes start on first use and load the story fonts
+render_pool = RenderPool(STORY_RENDER_WORKERS, STORY_RENDER_QUEUE, init_worker, (STORY_FONT_PATHS,))
@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config.settings import JOB_POLL_INTERVAL
+from app.db.database import SessionLocal
+from app.api.models.job import PublicationJob
+from app.workers.queue import publication_workers
+
+logger = logging.getLogger(__name__)
+
+def to_utc(value: datetime) -> datetime:
+    """Convert a datetime to naive UTC, the format stored in the database."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def schedule_publication(db: Session, kind: str, target_id: str, platform: str, publish_at: datetime) -> PublicationJob:
+    """Schedule a publication, moving an existing scheduled job for the same target and platform."""
+    publish_at = to_utc(publish_at)
+
+    job = db.query(PublicationJob).filter(
+        PublicationJob.kind == kind,
+        PublicationJob.target_id == target_id,
+        PublicationJob.platform == platform,
+        PublicationJob.status == "scheduled"
+    ).first()
+
+    if job is None:
+        job = PublicationJob(kind=kind, target_id=target_id, platform=platform, status="scheduled")
+        db.add(job)
+    job.publish_at = publish_at
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Scheduled job {job.id}: {kind} {target_id} to {platform} at {publish_at} UTC")
+
+    publication_scheduler.add(job.id, publish_at)
+    return job
+
+def cancel_publication(db: Session, job: PublicationJob) -> bool:
+    """Cancel a scheduled job. Jobs that already became due cannot be cancelled."""
+    cancelled = db.query(PublicationJob).filter(
+        PublicationJob.id == job.id,
+        PublicationJob.status == "scheduled"
+    ).update({PublicationJob.status: "cancelled"}, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return bool(cancelled)
+
+def release_due_job(job_id: str, now: datetime) -> bool:
+    """Move a due scheduled job into the queue.
+
+    The database is the source of truth: entries for jobs that were
+    cancelled or moved to a later time are skipped here.
+    """
+    db = SessionLocal()
+    try:
+        released = db.query(PublicationJob).filter(
+            PublicationJob.id == job_id,
+            PublicationJob.status == "scheduled",
+            PublicationJob.publish_at <= now
+        ).update({PublicationJob.status: "queued"}, synchronize_session=False)
+        db.commit()
+        return bool(released)
+    finally:
+        db.close()
+
+
+class PublicationScheduler:
+    """Releases scheduled jobs into the publication queue when they become due.
+
+    Due times are kept in a min-heap and the loop sleeps until the earliest
+    one, waking early only when a new job is scheduled, so the table is read
+    once at startup rather than polled.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add(self, job_id: str, publish_at: datetime):
+        """Track a scheduled job and wake the loop if it is now the earliest."""
+        heapq.heappush(self._heap, (publish_at, job_id))
+        if self._wakeup is not None and self._heap[0][1] == job_id:
+            self._wakeup.set()
+
+    def load(self) -> int:
+        """Load all scheduled jobs from the database into the heap."""
+        db = SessionLocal()
+        try:
+            jobs = db.query(PublicationJob.id, PublicationJob.publish_at).filter(
+                PublicationJob.status == "scheduled"
+            ).all()
+        finally:
+            db.close()
+
+        self._heap = [(publish_at or datetime.utcnow(), job_id) for job_id, publish_at in jobs]
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    async def start(self):
+        """Start the scheduler loop. Jobs that became due while stopped fire immediately."""
+        if self._task is not None:
+            return
+
+        count = self.load()
+        logger.info(f"Scheduler loaded {count} scheduled publication jobs")
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._wakeup = None
+
+    def stats(self) -> dict:
+        """Return the number of heap entries and the next due time."""
+        return {
+            "tracked": len(self._heap),
+            "next_due": self._heap[0][0].isoformat() if self._heap else None,
+        }
+
+    async def _run(self):
+        while True:
+            now = datetime.utcnow()
+            released = 0
+            while self._heap and self._heap[0][0] <= now:
+                _, job_id = heapq.heappop(self._heap)
+                try:
+                    if release_due_job(job_id, now):
+                        released += 1
+                        logger.info(f"Scheduled job {job_id} is due, queued for publishing")
+                except Exception as e:
+                    logger.error(f"Error releasing scheduled job {job_id}: {str(e)}")
+                    # Retry shortly instead of losing the job until the next restart
+                    heapq.heappush(self._heap, (now + timedelta(seconds=JOB_POLL_INTERVAL), job_id))
+
+            if released:
+                publication_workers.notify()
+
+            # Sleep until the next due time or until an earlier job is added
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+# Process-wide scheduler
+publication_scheduler = PublicationScheduler()
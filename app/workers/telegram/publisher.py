@@ -1,25 +1,62 @@
 import logging
 import asyncio
-from aiogram import Bot
 from aiogram.types import InputMediaPhoto, InputMediaVideo
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 
-from app.config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
+from app.config.settings import TELEGRAM_CHANNEL_IDS
 from app.db.database import SessionLocal
+from app.utils.telegram_bot import get_bot
 from app.api.models.post import Post, PublicationLog
+from app.workers.checkpoints import PublicationCheckpoints
 
 logger = logging.getLogger(__name__)
 
 class TelegramPublisher:
-    """Class for publishing posts to Telegram channel."""
+    """Class for publishing posts to Telegram channels."""
 
     def __init__(self):
-        """Initialize Telegram bot."""
-        self.bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        """Use the shared Telegram bot."""
+        self.bot = get_bot()
+
+    async def send_to_channel(self, channel_id, post_id, media, text, checkpoints):
+        """Send a post to one channel and return the ids of all its messages.
+
+        Media is sent in groups of 10 (Telegram limit). Flood waits are
+        handled by the shared bot's rate limit middleware. Messages sent by an
+        earlier attempt are skipped, so a retry doesn't repeat them.
+        """
+        message_ids = []
+        batches = [media[i:i + 10] for i in range(0, len(media), 10)] or [None]
+        for number, batch in enumerate(batches):
+            item = f"{channel_id}/{number}"
+            sent = checkpoints.get("messages", item)
+            if sent:
+                logger.info(f"Batch {number} of post {post_id} already sent to {channel_id}, skipping")
+                message_ids.extend(sent)
+                continue
+
+            if batch is None:
+                # Send text only
+                messages = [await self.bot.send_message(channel_id, text)]
+            elif len(batch) == 1:
+                # Media groups need at least 2 items
+                single = batch[0]
+                if isinstance(single, InputMediaVideo):
+                    messages = [await self.bot.send_video(channel_id, single.media, caption=single.caption)]
+                else:
+                    messages = [await self.bot.send_photo(channel_id, single.media, caption=single.caption)]
+            else:
+                logger.info(f"Sending batch {number} of {len(batch)} media items to {channel_id}")
+                messages = await self.bot.send_media_group(channel_id, media=batch)
+
+            sent = [message.message_id for message in messages]
+            checkpoints.save("messages", item, sent)
+            message_ids.extend(sent)
+        return message_ids
 
     async def publish_post(self, post_id):
-        """Publish a post to Telegram channel."""
+        """Publish a post to the Telegram channels."""
         db = SessionLocal()
         try:
             # Get post from database
@@ -37,6 +74,11 @@ class TelegramPublisher:
             # Get post text
             text = post.text
 
+            checkpoints = PublicationCheckpoints(post.id, "telegram")
+
+            if not TELEGRAM_CHANNEL_IDS:
+                raise Exception("No Telegram channels configured")
+
             # Check if post has media
             if post.photos or post.videos:
                 # Prepare media group
@@ -71,24 +113,17 @@ class TelegramPublisher:
                         # Add remaining videos without caption
                         for file_id in videos[1:]:
                             media.append(InputMediaVideo(media=file_id))
-
-                # Send media group in batches of 10 (Telegram limit)
-                if len(media) > 0:
-                    # Send first batch (up to 10 items)
-                    first_batch = media[:min(10, len(media))]
-                    logger.info(f"Sending first batch of {len(first_batch)} media items")
-                    await self.bot.send_media_group(TELEGRAM_CHANNEL_ID, media=first_batch)
-
-                    # If there are more than 10 media files, send them in additional batches
-                    if len(media) > 10:
-                        for i in range(10, len(media), 10):
-                            batch = media[i:min(i+10, len(media))]
-                            if batch:
-                                logger.info(f"Sending additional batch of {len(batch)} media items")
-                                await self.bot.send_media_group(TELEGRAM_CHANNEL_ID, media=batch)
             else:
-                # Send text only
-                await self.bot.send_message(TELEGRAM_CHANNEL_ID, text)
+                media = []
+
+            # Publish to all channels at once, each channel gets its batches in order
+            results = await asyncio.gather(
+                *(self.send_to_channel(channel_id, post_id, media, text, checkpoints) for channel_id in TELEGRAM_CHANNEL_IDS),
+                return_exceptions=True
+            )
+            errors = [f"{channel_id}: {str(result)}" for channel_id, result in zip(TELEGRAM_CHANNEL_IDS, results) if isinstance(result, Exception)]
+            if errors:
+                raise Exception(f"Failed to publish to {len(errors)} of {len(TELEGRAM_CHANNEL_IDS)} channels: {'; '.join(errors)}")
 
             # Update post status in database
             post.is_published_telegram = True
@@ -99,7 +134,7 @@ class TelegramPublisher:
                 post_id=post.id,
                 platform="telegram",
                 status="success",
-                message="Published to Telegram"
+                message=f"Published to Telegram: {sum(len(result) for result in results)} messages in {len(results)} channels"
             )
             db.add(log)
 
@@ -123,7 +158,6 @@ class TelegramPublisher:
             return False
         finally:
             db.close()
-            await self.bot.session.close()
 
 async def publish_post_to_telegram(post_id):
     """Publish a post to Telegram channel."""
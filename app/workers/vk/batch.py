@@ -0,0 +1,130 @@
+import logging
+import os
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import requests
+from vk_api.requests_pool import VkRequestsPool
+from vk_api.utils import sjson_dumps
+
+logger = logging.getLogger(__name__)
+
+# VK allows at most 25 API calls inside one execute. Batching keeps a post at a
+# constant number of round trips (and rate-limit tokens) instead of a few per photo.
+# All functions here block and are meant to run via run_blocking("vk", ...).
+EXECUTE_LIMIT = 25
+
+# Photos sent to a wall upload server in one request (file1..file5)
+WALL_UPLOAD_FILES = 5
+
+class BatchError(Exception):
+    """An API call inside an execute batch failed."""
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.error = error
+        super().__init__(f"{method} failed: [{error.get('error_code')}] {error.get('error_msg')}")
+
+def batch_methods(vk_session, calls: List[Tuple[str, dict]]) -> List[Union[Any, BatchError]]:
+    """Run independent API calls in as few execute requests as possible.
+
+    Returns one entry per call, in order: the call's response, or a
+    BatchError if that call failed. Failures don't affect the other calls.
+    """
+    with VkRequestsPool(vk_session) as pool:
+        results = [pool.method(method, values) for method, values in calls]
+
+    return [
+        result.result if result.ok else BatchError(method, result.error)
+        for (method, _), result in zip(calls, results)
+    ]
+
+def _execute(vk_session, code: str) -> dict:
+    """Run VKScript code and return the raw response with execute_errors."""
+    return vk_session.method("execute", {"code": code}, raw=True)
+
+def _log_execute_errors(response: dict):
+    for error in response.get("execute_errors", []):
+        logger.error(f"VK execute: {error.get('method')} failed: [{error.get('error_code')}] {error.get('error_msg')}")
+
+def save_photos_and_post(
+    vk_session,
+    items: List[Tuple[str, Union[dict, str]]],
+    post_values: Dict[str, Any]
+) -> Tuple[Optional[dict], List[List[str]]]:
+    """Save uploaded wall photos and publish the wall post in one execute.
+
+    items are ("save", saveWallPhoto values) for photos uploaded to the
+    wall upload server (one entry per upload request, which may hold
+    several photos), or ("attachment", "photo1_2"/"video1_2") for media
+    that is already saved. Attachment order follows items. Photos that fail
+    to save are left out of the post, as with one-by-one uploads.
+
+    Returns (wall.post response or None, attachments of each item). Saved
+    photos are returned even if wall.post fails, so they can be reused.
+    """
+    saves = sum(1 for kind, _ in items if kind == "save")
+    if saves > EXECUTE_LIMIT - 1:
+        raise ValueError(f"At most {EXECUTE_LIMIT - 1} photos can be saved together with the post")
+
+    lines = ['var att = "";', 'var sep = "";', "var saved = [];", "var r;", "var i;", "var s;", "var ssep;"]
+    for kind, value in items:
+        if kind == "save":
+            lines.append(f"r = API.photos.saveWallPhoto({sjson_dumps(value)});")
+            lines.append(
+                's = ""; ssep = ""; if (r) { i = 0; while (i < r.length) { '
+                's = s + ssep + "photo" + r[i].owner_id + "_" + r[i].id; ssep = ","; i = i + 1; } }'
+            )
+            lines.append('saved.push(s); if (s != "") { att = att + sep + s; sep = ","; }')
+        else:
+            lines.append(f"att = att + sep + {sjson_dumps(value)}; sep = \",\";")
+
+    values = ", ".join(f"{sjson_dumps(key)}: {sjson_dumps(value)}" for key, value in post_values.items())
+    lines.append(f"var post = API.wall.post({{{values}, \"attachments\": att}});")
+    lines.append('return {"post": post, "saved": saved};')
+
+    response = _execute(vk_session, "\n".join(lines))
+    _log_execute_errors(response)
+
+    result = response.get("response") or {}
+    saved = iter(result.get("saved") or [])
+    attachments = [
+        [a for a in (next(saved, "") or "").split(",") if a] if kind == "save" else [value]
+        for kind, value in items
+    ]
+    return result.get("post") or None, attachments
+
+def save_story_and_get(vk_session, save_values: dict, owner_id: Union[int, str]) -> Tuple[Any, Any]:
+    """Save an uploaded story and fetch the owner's stories in one execute.
+
+    Returns (stories.save response, stories.get response); either is None if
+    that call failed.
+    """
+    code = (
+        f"var saved = API.stories.save({sjson_dumps(save_values)});\n"
+        f"return {{\"save\": saved, \"stories\": API.stories.get({sjson_dumps({'owner_id': owner_id})})}};"
+    )
+    response = _execute(vk_session, code)
+    _log_execute_errors(response)
+
+    result = response.get("response") or {}
+    return result.get("save") or None, result.get("stories") or None
+
+def upload_file(upload_url: str, path: str, field: str) -> dict:
+    """POST a file to a VK upload server and return its JSON response."""
+    return upload_files(upload_url, [path], field)
+
+def upload_files(upload_url: str, paths: List[str], field: str = "file{}") -> dict:
+    """POST several files to a VK upload server in one multipart request.
+
+    Files are streamed from disk; field is formatted with the 1-based file
+    number ("file{}" gives file1, file2, ...).
+    """
+    with ExitStack() as stack:
+        files = [
+            (field.format(i), (os.path.basename(path), stack.enter_context(open(path, "rb"))))
+            for i, path in enumerate(paths, 1)
+        ]
+        response = requests.post(upload_url, files=files)
+    response.raise_for_status()
+    return response.json()
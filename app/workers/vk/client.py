@@ -0,0 +1,41 @@
+import logging
+
+import vk_api
+
+from app.config.settings import VK_ACCESS_TOKEN, VK_GROUP_ID, VK_API_URL, VK_TOO_MANY_RPS_PAUSE
+from app.utils.base_url import redirect_session
+from app.utils.rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedVkApi(vk_api.VkApi):
+    """VkApi session that paces API calls through the shared VK token bucket.
+
+    vk_api's own RPS_DELAY only spaces calls made through one session;
+    publishers create a session per publication, so the bucket is what keeps
+    concurrent publications under VK's requests-per-second limit.
+    """
+
+    RPS_DELAY = 0
+
+    def __init__(self, *args, account: str = "default", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = get_limiter("vk", account)
+
+    def method(self, method, values=None, *args, **kwargs):
+        self.limiter.acquire_sync()
+        return super().method(method, values, *args, **kwargs)
+
+    def too_many_rps_handler(self, error):
+        """Error 6 "Too many requests per second": hold the bucket back, then retry."""
+        logger.warning(f"VK rate limit hit on {error.method}, pausing {VK_TOO_MANY_RPS_PAUSE}s")
+        self.limiter.pause(VK_TOO_MANY_RPS_PAUSE)
+        return error.try_method()
+
+def create_vk_session(**kwargs) -> RateLimitedVkApi:
+    """Create a rate-limited VK session for the configured group token."""
+    session = RateLimitedVkApi(token=VK_ACCESS_TOKEN, account=VK_GROUP_ID or "default", **kwargs)
+    if VK_API_URL:
+        redirect_session(session.http, VK_API_URL, "https://api.vk.ru/", "https://api.vk.com/")
+    return session
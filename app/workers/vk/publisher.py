@@ -1,14 +1,19 @@
 import vk_api
 import logging
-import aiohttp
 import asyncio
+import hashlib
 import requests
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 
-from app.config.settings import VK_ACCESS_TOKEN, VK_GROUP_ID, API_HOST, API_PORT
+from app.config.settings import VK_GROUP_ID, VK_UPLOAD_CONCURRENCY
 from app.db.database import SessionLocal
 from app.api.models.post import Post, PublicationLog
+from app.workers.prefetch import ensure_post_media
+from app.workers.checkpoints import PublicationCheckpoints
+from app.workers.executor import run_blocking
+from app.workers.vk.client import create_vk_session
+from app.workers.vk.batch import batch_methods, save_photos_and_post, upload_file, upload_files, WALL_UPLOAD_FILES
 
 logger = logging.getLogger(__name__)
 
@@ -17,102 +22,243 @@ class VKPublisher:
 
     def __init__(self):
         """Initialize VK API session."""
-        self.vk_session = vk_api.VkApi(token=VK_ACCESS_TOKEN)
+        self.vk_session = create_vk_session()
         self.vk = self.vk_session.get_api()
         self.upload = vk_api.VkUpload(self.vk_session)
 
-    async def download_telegram_file(self, file_id):
-        """Download file from Telegram by file_id."""
-        # Create a bot instance to get file info
-        bot = None
+    def upload_photo(self, media_path):
+        """Upload a photo for a wall post and return its attachment strings (blocking)."""
         try:
-            from app.config.settings import TELEGRAM_BOT_TOKEN
-            from aiogram import Bot
-            bot = Bot(token=TELEGRAM_BOT_TOKEN)
+            # Try using photo_wall method
+            upload_result = self.upload.photo_wall(
+                media_path,
+                group_id=abs(int(VK_GROUP_ID))
+            )
+        except Exception as e:
+            logger.error(f"Error using photo_wall: {str(e)}")
+            # Fallback to regular photo upload
+            try:
+                # Create an album if needed
+                albums = self.vk.photos.getAlbums(owner_id=-abs(int(VK_GROUP_ID)))
+                album_id = None
+
+                # Look for a "Wall Photos" album
+                for album in albums.get("items", []):
+                    if album.get("title") == "Wall Photos":
+                        album_id = album.get("id")
+                        break
+
+                # If no album found, create one
+                if not album_id:
+                    album = self.vk.photos.createAlbum(
+                        title="Wall Photos",
+                        group_id=abs(int(VK_GROUP_ID)),
+                        description="Photos for wall posts"
+                    )
+                    album_id = album.get("id")
+
+                # Upload to the album
+                upload_result = self.upload.photo(
+                    media_path,
+                    album_id=album_id,
+                    group_id=abs(int(VK_GROUP_ID))
+                )
+            except Exception as e2:
+                logger.error(f"Error with fallback photo upload: {str(e2)}")
+                # Last resort - try uploading to wall directly
+                upload_server = self.vk.photos.getWallUploadServer(group_id=abs(int(VK_GROUP_ID)))
+
+                # Upload photo to server
+                with open(media_path, 'rb') as f:
+                    response = requests.post(upload_server['upload_url'], files={'photo': f}).json()
+
+                # Save photo to wall
+                upload_result = self.vk.photos.saveWallPhoto(
+                    group_id=abs(int(VK_GROUP_ID)),
+                    photo=response['photo'],
+                    server=response['server'],
+                    hash=response['hash']
+                )
+
+        # Format attachment strings
+        return [f"photo{photo['owner_id']}_{photo['id']}" for photo in upload_result]
+
+    def upload_video(self, media_path, name, description):
+        """Upload a video to the group and return its attachment strings (blocking)."""
+        upload_result = self.upload.video(
+            video_file=media_path,
+            name=name,
+            description=description,
+            group_id=abs(int(VK_GROUP_ID))
+        )
+
+        # Format attachment string
+        return [f"video{upload_result['owner_id']}_{upload_result['video_id']}"]
+
+    def upload_wall_photos(self, upload_url, media_paths):
+        """Upload several photos to a wall upload server in one request and return the saveWallPhoto values (blocking)."""
+        response = upload_files(upload_url, media_paths)
+        if not response.get("photo") or response.get("photo") == "[]":
+            raise Exception(f"Empty upload response: {response}")
+
+        return {
+            "group_id": abs(int(VK_GROUP_ID)),
+            "photo": response["photo"],
+            "server": response["server"],
+            "hash": response["hash"]
+        }
+
+    def save_unbatched(self, items):
+        """Save photos one call at a time, used if the execute batch fails (blocking).
+
+        Returns the attachments of each item, like save_photos_and_post.
+        """
+        attachments = []
+        for kind, value in items:
+            if kind == "save":
+                try:
+                    attachments.append([f"photo{photo['owner_id']}_{photo['id']}" for photo in self.vk.photos.saveWallPhoto(**value)])
+                except Exception as e:
+                    logger.error(f"Error saving photos: {str(e)}")
+                    attachments.append([])
+            else:
+                attachments.append([value])
+        return attachments
 
-            # Get file info directly from Telegram
-            file_info = await bot.get_file(file_id)
-            file_path = file_info.file_path
+    async def post_to_wall(self, post, checkpoints):
+        """Upload the post media and publish the wall post, reusing media saved by earlier attempts."""
+        text = post.text
 
-            # Get direct file URL
-            file_url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
+        # Get media prefetched into the post directory
+        media_files = await ensure_post_media(post.id)
 
-            # Download file with SSL verification disabled
-            async with aiohttp.ClientSession() as session:
-                try:
-                    # Create a custom SSL context that doesn't verify certificates
-                    import ssl
-                    ssl_context = ssl.create_default_context()
-                    ssl_context.check_hostname = False
-                    ssl_context.verify_mode = ssl.CERT_NONE
-
-                    async with session.get(file_url, ssl=ssl_context) as response:
-                        if response.status == 200:
-                            return await response.read()
-                        logger.error(f"Failed to download file from Telegram: {response.status}")
-                        return None
-                except Exception as e:
-                    logger.error(f"Error downloading file from Telegram: {str(e)}")
-                    return None
+        description = text[:200] + "..." if len(text) > 200 else text
+        group_id = abs(int(VK_GROUP_ID))
+
+        # Media saved to VK by an earlier attempt is attached as is
+        pending = [
+            (kind, file_id, path) for kind, file_id, path in media_files
+            if path and not checkpoints.get("attachment", file_id)
+        ]
+
+        # One execute gets the wall upload server and creates every video entry
+        has_photos = any(kind == "photo" for kind, _, _ in pending)
+        video_count = sum(1 for kind, _, _ in pending if kind == "video")
+
+        calls = [("photos.getWallUploadServer", {"group_id": group_id})] if has_photos else []
+        calls += [("video.save", {"name": post.name, "description": description, "group_id": group_id})] * video_count
+
+        try:
+            prepared = await run_blocking("vk", batch_methods, self.vk_session, calls) if calls else []
         except Exception as e:
-            logger.error(f"Error downloading file {file_id} from Telegram: {str(e)}")
+            logger.error(f"Error preparing VK uploads: {str(e)}")
+            prepared = [e] * len(calls)
 
-            # Fallback to our API endpoint
-            try:
-                async with aiohttp.ClientSession() as session:
-                    url = f"http://{API_HOST}:{API_PORT}/api/telegram/file/{file_id}"
+        upload_server = prepared.pop(0) if has_photos else None
+        video_entries = iter(prepared)
 
-                    # Try to download directly from our API
+        # Upload all media concurrently in the VK executor, keeping the order the user chose.
+        # Photos go to the wall upload server several files per request.
+        semaphore = asyncio.Semaphore(VK_UPLOAD_CONCURRENCY)
+
+        async def saved(file_id):
+            return [([file_id], ("attachment", checkpoints.get("attachment", file_id)))]
+
+        async def upload_photos(group):
+            async with semaphore:
+                if isinstance(upload_server, dict):
                     try:
-                        async with session.get(url) as response:
-                            if response.status == 200:
-                                return await response.read()
-                            logger.error(f"Failed to download file from API: {response.status}")
-                    except Exception as e2:
-                        logger.error(f"Error connecting to API: {str(e2)}")
-
-                    # If that fails, try a different approach - download directly from Telegram
-                    # but save to a temporary file first
+                        paths = [path for _, path in group]
+                        values = await run_blocking("vk", self.upload_wall_photos, upload_server["upload_url"], paths)
+                        return [([file_id for file_id, _ in group], ("save", values))]
+                    except Exception as e:
+                        logger.warning(f"Error uploading {len(group)} photos to wall server, falling back: {str(e)}")
+
+                # Upload one by one through the original fallback chain
+                items = []
+                for file_id, path in group:
                     try:
-                        import tempfile
-                        import os
-
-                        # Create a temporary file
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                            temp_path = temp_file.name
-
-                        # Use curl to download the file (curl handles SSL issues better)
-                        import subprocess
-                        curl_cmd = [
-                            "curl",
-                            "-s",
-                            "-k",  # Skip SSL verification
-                            f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}",
-                            "-o", temp_path
-                        ]
-
-                        process = subprocess.run(curl_cmd, capture_output=True)
-
-                        if process.returncode == 0:
-                            # Read the file
-                            with open(temp_path, "rb") as f:
-                                content = f.read()
-
-                            # Clean up
-                            os.unlink(temp_path)
-
-                            return content
-                    except Exception as e3:
-                        logger.error(f"Error using curl fallback: {str(e3)}")
-
-                # If all methods fail
-                return None
-            except Exception as e2:
-                logger.error(f"Error in fallback methods for file {file_id}: {str(e2)}")
-                return None
-        finally:
-            if bot:
-                await bot.session.close()
+                        attachments = await run_blocking("vk", self.upload_photo, path)
+                        checkpoints.save("attachment", file_id, ",".join(attachments))
+                        items.extend(([file_id], ("attachment", attachment)) for attachment in attachments)
+                    except Exception as e:
+                        logger.error(f"Error uploading photo {file_id}: {str(e)}")
+                return items
+
+        async def upload_video(file_id, media_path, video_entry):
+            async with semaphore:
+                try:
+                    if isinstance(video_entry, dict):
+                        await run_blocking("vk", upload_file, video_entry["upload_url"], media_path, "video_file")
+                        attachments = [f"video{video_entry['owner_id']}_{video_entry['video_id']}"]
+                    else:
+                        attachments = await run_blocking("vk", self.upload_video, media_path, post.name, description)
+                    checkpoints.save("attachment", file_id, ",".join(attachments))
+                    return [([file_id], ("attachment", attachment)) for attachment in attachments]
+                except Exception as e:
+                    logger.error(f"Error uploading video {file_id}: {str(e)}")
+                    return []
+
+        # Consecutive photos still to upload are grouped per upload request
+        uploads = []
+        group = []
+        for kind, file_id, path in media_files:
+            if kind == "photo" and path and not checkpoints.get("attachment", file_id):
+                group.append((file_id, str(path)))
+                if len(group) == WALL_UPLOAD_FILES:
+                    uploads.append(upload_photos(group))
+                    group = []
+                continue
+
+            if group:
+                uploads.append(upload_photos(group))
+                group = []
+            if not path:
+                logger.error(f"Failed to download {kind} {file_id}")
+            elif checkpoints.get("attachment", file_id):
+                uploads.append(saved(file_id))
+            else:
+                uploads.append(upload_video(file_id, str(path), next(video_entries)))
+        if group:
+            uploads.append(upload_photos(group))
+
+        results = await asyncio.gather(*uploads)
+        sources = [file_ids for result in results for file_ids, _ in result]
+        items = [item for result in results for _, item in result]
+
+        # Save the photos and post to the wall in one execute. The guid makes VK
+        # return the existing post if an earlier attempt's wall.post went through.
+        post_values = {
+            "owner_id": -group_id,  # Negative ID for group
+            "from_group": 1,  # Post as group
+            "message": text,
+            "guid": hashlib.sha1(f"{post.id}\n{text}".encode("utf-8")).hexdigest()
+        }
+        try:
+            post_result, attachments = await run_blocking("vk", save_photos_and_post, self.vk_session, items, post_values)
+        except Exception as e:
+            logger.error(f"Error in batched VK wall post, posting call by call: {str(e)}")
+            attachments = await run_blocking("vk", self.save_unbatched, items)
+            # Keep the saved photos before posting, so a failing wall.post doesn't lose them
+            self.save_photo_checkpoints(checkpoints, items, sources, attachments)
+            post_result = await run_blocking(
+                "vk", self.vk.wall.post,
+                attachments=",".join(a for item in attachments for a in item), **post_values
+            )
+        else:
+            self.save_photo_checkpoints(checkpoints, items, sources, attachments)
+
+        if post_result:
+            checkpoints.save("wall_post", "", post_result)
+        return post_result
+
+    def save_photo_checkpoints(self, checkpoints, items, sources, attachments):
+        """Record photos saved from wall upload server responses."""
+        for (kind, _), file_ids, saved in zip(items, sources, attachments):
+            # Photos that failed to save can't be matched to their files, upload the group again
+            if kind == "save" and len(saved) == len(file_ids):
+                for file_id, attachment in zip(file_ids, saved):
+                    checkpoints.save("attachment", file_id, attachment)
 
     async def publish_post(self, post_id):
         """Publish a post to VK."""
@@ -130,129 +276,15 @@ class VKPublisher:
                 logger.info(f"Post {post_id} already published to VK")
                 return True
 
-            # Get post text
-            text = post.text
-
-            # Download and upload photos
-            photo_attachments = []
-            for file_id in post.photos:
-                try:
-                    # Download photo from Telegram
-                    photo_data = await self.download_telegram_file(file_id)
-
-                    if not photo_data:
-                        logger.error(f"Failed to download photo {file_id}")
-                        continue
+            checkpoints = PublicationCheckpoints(post.id, "vk")
 
-                    # Save photo to temporary file
-                    temp_file = f"/tmp/{file_id}.jpg"
-                    with open(temp_file, "wb") as f:
-                        f.write(photo_data)
+            # The wall post may have gone through on an attempt that failed afterwards
+            post_result = checkpoints.get("wall_post")
+            if not post_result:
+                post_result = await self.post_to_wall(post, checkpoints)
 
-                    # Upload photo to VK wall
-                    try:
-                        # Try using photo_wall method
-                        upload_result = self.upload.photo_wall(
-                            temp_file,
-                            group_id=abs(int(VK_GROUP_ID))
-                        )
-                    except Exception as e:
-                        logger.error(f"Error using photo_wall: {str(e)}")
-                        # Fallback to regular photo upload
-                        try:
-                            # Create an album if needed
-                            albums = self.vk.photos.getAlbums(owner_id=-abs(int(VK_GROUP_ID)))
-                            album_id = None
-
-                            # Look for a "Wall Photos" album
-                            for album in albums.get("items", []):
-                                if album.get("title") == "Wall Photos":
-                                    album_id = album.get("id")
-                                    break
-
-                            # If no album found, create one
-                            if not album_id:
-                                album = self.vk.photos.createAlbum(
-                                    title="Wall Photos",
-                                    group_id=abs(int(VK_GROUP_ID)),
-                                    description="Photos for wall posts"
-                                )
-                                album_id = album.get("id")
-
-                            # Upload to the album
-                            upload_result = self.upload.photo(
-                                temp_file,
-                                album_id=album_id,
-                                group_id=abs(int(VK_GROUP_ID))
-                            )
-                        except Exception as e2:
-                            logger.error(f"Error with fallback photo upload: {str(e2)}")
-                            # Last resort - try uploading to wall directly
-                            upload_server = self.vk.photos.getWallUploadServer(group_id=abs(int(VK_GROUP_ID)))
-
-                            # Upload photo to server
-                            with open(temp_file, 'rb') as f:
-                                response = requests.post(upload_server['upload_url'], files={'photo': f}).json()
-
-                            # Save photo to wall
-                            save_result = self.vk.photos.saveWallPhoto(
-                                group_id=abs(int(VK_GROUP_ID)),
-                                photo=response['photo'],
-                                server=response['server'],
-                                hash=response['hash']
-                            )
-
-                            upload_result = save_result
-
-                    # Format attachment string
-                    for photo in upload_result:
-                        owner_id = photo["owner_id"]
-                        photo_id = photo["id"]
-                        photo_attachments.append(f"photo{owner_id}_{photo_id}")
-                except Exception as e:
-                    logger.error(f"Error uploading photo {file_id}: {str(e)}")
-
-            # Download and upload videos
-            video_attachments = []
-            for file_id in post.videos:
-                try:
-                    # Download video from Telegram
-                    video_data = await self.download_telegram_file(file_id)
-
-                    if not video_data:
-                        logger.error(f"Failed to download video {file_id}")
-                        continue
-
-                    # Save video to temporary file
-                    temp_file = f"/tmp/{file_id}.mp4"
-                    with open(temp_file, "wb") as f:
-                        f.write(video_data)
-
-                    # Upload video to VK
-                    upload_result = self.upload.video(
-                        video_file=temp_file,
-                        name=post.name,
-                        description=text[:200] + "..." if len(text) > 200 else text,
-                        group_id=abs(int(VK_GROUP_ID))
-                    )
-
-                    # Format attachment string
-                    owner_id = upload_result["owner_id"]
-                    video_id = upload_result["video_id"]
-                    video_attachments.append(f"video{owner_id}_{video_id}")
-                except Exception as e:
-                    logger.error(f"Error uploading video {file_id}: {str(e)}")
-
-            # Combine all attachments
-            attachments = ",".join(photo_attachments + video_attachments)
-
-            # Post to VK wall
-            self.vk.wall.post(
-                owner_id=-abs(int(VK_GROUP_ID)),  # Negative ID for group
-                from_group=1,  # Post as group
-                message=text,
-                attachments=attachments
-            )
+            if not post_result:
+                raise Exception("VK wall.post failed")
 
             # Update post status in database
             post.is_published_vk = True
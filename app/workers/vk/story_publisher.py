@@ -1,17 +1,18 @@
 import vk_api
 import logging
-import aiohttp
 import asyncio
 import requests
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 import os
-from PIL import Image, ImageDraw, ImageFont
-import io
 
-from app.config.settings import VK_ACCESS_TOKEN, VK_GROUP_ID, API_HOST, API_PORT
+from app.config.settings import VK_GROUP_ID
 from app.db.database import SessionLocal
 from app.api.models.story import Story, StoryPublicationLog
+from app.utils.story_renderer import story_renderer
+from app.workers.executor import run_blocking
+from app.workers.vk.client import create_vk_session
+from app.workers.vk.batch import save_story_and_get
 
 logger = logging.getLogger(__name__)
 
@@ -20,94 +21,10 @@ class VKStoryPublisher:
 
     def __init__(self):
         """Initialize VK API session."""
-        self.vk_session = vk_api.VkApi(token=VK_ACCESS_TOKEN, api_version="5.131")
+        self.vk_session = create_vk_session(api_version="5.131")
         self.vk = self.vk_session.get_api()
         self.upload = vk_api.VkUpload(self.vk_session)
 
-    async def download_telegram_file(self, file_id):
-        """Download file from Telegram."""
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"http://{API_HOST}:{API_PORT}/api/telegram/file/{file_id}"
-
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
-                        logger.error(f"Failed to download file {file_id}: {response.status}")
-                        return None
-        except Exception as e:
-            logger.error(f"Error downloading file {file_id}: {str(e)}")
-            return None
-
-    def create_story_image(self, image_data, model_name, price):
-        """Create a story image with model name and price overlay."""
-        try:
-            # Open the image
-            image = Image.open(io.BytesIO(image_data))
-
-            # Resize image to story format (9:16)
-            width, height = image.size
-            target_ratio = 9 / 16
-            current_ratio = width / height
-
-            if current_ratio > target_ratio:
-                # Image is too wide, crop width
-                new_width = int(height * target_ratio)
-                left = (width - new_width) // 2
-                image = image.crop((left, 0, left + new_width, height))
-            elif current_ratio < target_ratio:
-                # Image is too tall, crop height
-                new_height = int(width / target_ratio)
-                top = (height - new_height) // 2
-                image = image.crop((0, top, width, top + new_height))
-
-            # Resize to standard story size
-            image = image.resize((1080, 1920))
-
-            # Create a drawing context
-            draw = ImageDraw.Draw(image)
-
-            # Try to load a font, fall back to default if not available
-            try:
-                # Используем более крупный шрифт для лучшей видимости
-                font_large = ImageFont.truetype("arial.ttf", 80)
-            except IOError:
-                try:
-                    # Пробуем загрузить системный шрифт
-                    font_large = ImageFont.truetype("/System/Library/Fonts/Supplemental/Arial.ttf", 80)
-                except IOError:
-                    # Если не удалось, используем стандартный
-                    font_large = ImageFont.load_default()
-
-            # Формируем текст в одну строку
-            text = ""
-            if model_name and price:
-                text = f"{model_name} - {price}"
-            elif model_name:
-                text = model_name
-            elif price:
-                text = f"Цена: {price}"
-
-            if text:
-                # Рисуем текст с обводкой для лучшей видимости на любом фоне
-                # Сначала рисуем черную обводку
-                for offset_x, offset_y in [(-2, -2), (-2, 2), (2, -2), (2, 2)]:
-                    draw.text((540 + offset_x, 1800 + offset_y), text, font=font_large, fill=(0, 0, 0), anchor="ms")
-
-                # Затем рисуем белый текст поверх
-                draw.text((540, 1800), text, font=font_large, fill=(255, 255, 255), anchor="ms")
-
-            # Save the image to a buffer
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG")
-            buffer.seek(0)
-
-            return buffer.getvalue()
-        except Exception as e:
-            logger.error(f"Error creating story image: {str(e)}")
-            return None
-
     async def publish_story(self, story_id):
         """Publish a story to VK."""
         db = SessionLocal()
@@ -124,18 +41,12 @@ class VKStoryPublisher:
                 logger.info(f"Story {story_id} already published to VK")
                 return True
 
-            # Download media file from Telegram
             if not story.media_file_id:
                 logger.error(f"Story {story_id} has no media file")
                 return False
 
-            media_data = await self.download_telegram_file(story.media_file_id)
-            if not media_data:
-                logger.error(f"Failed to download media file for story {story_id}")
-                return False
-
-            # Create story image with overlay
-            story_image_data = self.create_story_image(media_data, story.model_name, story.price)
+            # Create story image with overlay (or take it from the render cache)
+            story_image_data = await story_renderer.render(story.media_file_id, story.model_name, story.price, "vk")
             if not story_image_data:
                 logger.error(f"Failed to create story image for story {story_id}")
                 return False
@@ -149,7 +60,9 @@ class VKStoryPublisher:
             # Сначала получаем URL для загрузки фото
             try:
                 # Получаем адрес сервера для загрузки истории
-                upload_server = self.vk.stories.getPhotoUploadServer(
+                upload_server = await run_blocking(
+                    "vk",
+                    self.vk.stories.getPhotoUploadServer,
                     add_to_news=1,  # Добавить в новости
                     group_id=abs(int(VK_GROUP_ID)),  # ID группы (положительное число)
                     user_ids=[],  # Пустой список пользователей
@@ -165,7 +78,7 @@ class VKStoryPublisher:
 
                 # Загружаем фото на сервер
                 with open(temp_file, 'rb') as file:
-                    response = requests.post(upload_server['upload_url'], files={'file': file})
+                    response = await run_blocking("vk", requests.post, upload_server['upload_url'], files={'file': file})
 
                 if response.status_code != 200:
                     logger.error(f"Failed to upload story to VK: {response.status_code} {response.text}")
@@ -178,14 +91,21 @@ class VKStoryPublisher:
                     logger.error(f"Invalid upload response from VK: {upload_data}")
                     raise Exception("Invalid upload response from VK")
 
-                # Сохраняем историю
-                save_result = self.vk.stories.save(
-                    upload_results=upload_data['upload_result'],
-                    group_id=abs(int(VK_GROUP_ID))
+                # Сохраняем историю и сразу получаем список историй группы одним запросом execute
+                save_result, stories = await run_blocking(
+                    "vk",
+                    save_story_and_get,
+                    self.vk_session,
+                    {"upload_results": upload_data['upload_result'], "group_id": abs(int(VK_GROUP_ID))},
+                    VK_GROUP_ID
                 )
 
                 logger.info(f"VK save result: {save_result}")
 
+                # stories.save отдает {"count", "items"} в новых версиях API и список в старых
+                if isinstance(save_result, dict):
+                    save_result = save_result.get("items")
+
                 # Проверяем результат сохранения
                 if not save_result or not isinstance(save_result, list) or len(save_result) == 0:
                     logger.error(f"Failed to save story to VK: {save_result}")
@@ -198,17 +118,10 @@ class VKStoryPublisher:
                 story_link = f"https://vk.com/stories{owner_id}_{story_id}"
 
                 # Проверяем, что история действительно опубликована
-                try:
-                    # Получаем список историй группы
-                    stories = self.vk.stories.get(owner_id=VK_GROUP_ID)
-                    logger.info(f"VK stories response: {stories}")
-
-                    if not stories or 'items' not in stories or len(stories['items']) == 0:
-                        logger.warning(f"Story may not be published to VK: no stories found for group {VK_GROUP_ID}")
-                        # Но продолжаем, так как сохранение истории прошло успешно
-                except Exception as e:
-                    logger.warning(f"Could not verify story publication: {str(e)}")
-                    # Продолжаем, так как основная операция сохранения прошла успешно
+                logger.info(f"VK stories response: {stories}")
+                if not stories or 'items' not in stories or len(stories['items']) == 0:
+                    logger.warning(f"Story may not be published to VK: no stories found for group {VK_GROUP_ID}")
+                    # Но продолжаем, так как сохранение истории прошло успешно
             except Exception as e:
                 logger.error(f"Error publishing story to VK: {str(e)}")
                 raise Exception(f"Error publishing story to VK: {str(e)}")
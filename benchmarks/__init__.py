@@ -0,0 +1 @@
+# Benchmarks that run the publishers against the fake platform servers
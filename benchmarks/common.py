@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(values: List[float], share: float) -> Optional[float]:
+    """Percentile of values (share between 0 and 1) with linear interpolation."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * share
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/max of latencies in seconds, rounded to milliseconds."""
+    summary = {
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else None,
+    }
+    return {key: round(value, 3) if value is not None else None for key, value in summary.items()}
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+def peak_rss() -> int:
+    """Peak resident set size of this process so far (or since reset_peak_rss), in bytes."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS. It survives exec,
+    # so in a spawned process it can report the parent's peak.
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+def reset_peak_rss() -> bool:
+    """Start peak_rss over from the current RSS (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class RssSampler:
+    """Samples the process RSS in the background to find the peak of one run."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, current_rss())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.peak = current_rss()
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self) -> int:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+def environment() -> dict:
+    """Describe where the benchmark ran, so results from different machines are not compared blindly."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def save_results(name: str, results: dict, output: Optional[str] = None) -> Path:
+    """Write results as JSON, by default to benchmarks/results/<name>-<UTC time>.json."""
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from benchmarks.common import RssSampler, environment, latency_summary, peak_rss, save_results
+from fake_platforms.common import Faults
+from fake_platforms.instagram import write_session
+from fake_platforms.server import DEFAULT_PORTS, FakePlatforms
+
+# End-to-end publishing benchmark: runs the post and story publishers against
+# the fake platform servers in this process and saves throughput, latency,
+# peak RSS and traffic per scenario as JSON.
+#
+#     python -m benchmarks.publish --posts 20 --concurrency 4
+#
+# The app reads its settings on import, so everything from app is imported
+# after configure_environment.
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ["telegram_posts", "vk_posts", "instagram_posts", "telegram_stories", "vk_stories", "instagram_stories"]
+
+# The configured token buckets would otherwise decide the result
+UNTHROTTLED_RATE_LIMITS = {
+    "TELEGRAM_RATE_LIMIT": "1000",
+    "TELEGRAM_RATE_BURST": "1000",
+    "TELEGRAM_CHAT_RATE_LIMIT": "1000",
+    "TELEGRAM_CHAT_RATE_BURST": "1000",
+    "VK_RATE_LIMIT": "1000",
+    "VK_RATE_BURST": "1000",
+    "INSTAGRAM_RATE_LIMIT": "1000",
+    "INSTAGRAM_RATE_BURST": "1000",
+}
+
+WORDS = ["кроссовки", "размер", "цена", "доставка", "оригинал", "новые", "в наличии", "скидка", "модель", "цвет"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the post and story publishers against fake platforms")
+    parser.add_argument("--posts", type=int, default=20, help="Posts or stories published per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Publications running at the same time")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--max-media", type=int, default=10, help="Posts get 0 to this many photos and videos")
+    parser.add_argument("--video-share", type=float, default=0.2, help="Share of media items that are videos")
+    parser.add_argument("--photo-size", default="1280x960", help="Size of the photos Telegram serves, WIDTHxHEIGHT")
+    parser.add_argument("--video-mb", type=float, default=5, help="Size of the videos Telegram serves, MB")
+    parser.add_argument("--channels", type=int, default=1, help="Telegram channels posts are published to")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every fake platform request")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a server error")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with a rate-limit error")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the configured outbound rate limits")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic posts")
+    for platform, port in DEFAULT_PORTS.items():
+        parser.add_argument(f"--{platform}-port", type=int, default=port)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/publish-<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's INFO logs")
+    return parser.parse_args()
+
+def configure_environment(args, workdir: Path, urls: Dict[str, str]):
+    """Point the app at the fake platforms, a scratch database and scratch caches."""
+    channels = [f"@benchmark{i}" for i in range(args.channels)]
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'benchmark.db'}",
+        "MEDIA_CACHE_DIR": str(workdir / "cache"),
+        "STORY_CACHE_DIR": str(workdir / "stories"),
+        "TELEGRAM_BOT_TOKEN": "123456:benchmark",
+        "TELEGRAM_API_URL": urls["telegram"],
+        "TELEGRAM_CHANNEL_ID": channels[0],
+        "TELEGRAM_CHANNEL_IDS": ",".join(channels),
+        "VK_API_URL": urls["vk"],
+        "VK_ACCESS_TOKEN": "benchmark",
+        "VK_GROUP_ID": "1",
+        "INSTAGRAM_API_URL": urls["instagram"],
+        "INSTAGRAM_USERNAME": "benchmark",
+        "INSTAGRAM_PASSWORD": "benchmark",
+        "INSTAGRAM_SESSION_PATH": str(workdir / "instagram_session.json"),
+    })
+    if not args.keep_rate_limits:
+        os.environ.update(UNTHROTTLED_RATE_LIMITS)
+    write_session(os.environ["INSTAGRAM_SESSION_PATH"])
+
+def synthetic_post(rng: random.Random, run_id: str, index: int, max_media: int, video_share: float) -> Tuple[str, List[str], List[str]]:
+    """Text, photo file ids and video file ids of one synthetic post.
+
+    File ids are unique per post, so every publication downloads its media
+    like a new post would. The fake Telegram serves a video for ids
+    containing "video".
+    """
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 120))]
+    text = f"Модель {index} " + " ".join(words) + f"\nЦена: {rng.randint(10, 300) * 100} руб."
+    photos, videos = [], []
+    for i in range(rng.randint(0, max_media)):
+        if rng.random() < video_share:
+            videos.append(f"{run_id}-{index}-video{i}")
+        else:
+            photos.append(f"{run_id}-{index}-photo{i}")
+    return text, photos, videos
+
+
+async def run_scenario(
+    name: str,
+    publish: Callable[[str], Awaitable[bool]],
+    item_ids: List[str],
+    media_items: int,
+    concurrency: int,
+    platforms: FakePlatforms
+) -> dict:
+    """Publish every item, concurrency at a time, and measure the run."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failed = 0
+
+    async def publish_one(item_id: str):
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                published = await publish(item_id)
+            except Exception as e:
+                logger.error(f"{name}: publishing {item_id} raised {str(e)}")
+                published = False
+            latencies.append(time.perf_counter() - started)
+            if not published:
+                failed += 1
+
+    before = platforms.stats()
+    sampler = RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(publish_one(item_id) for item_id in item_ids))
+    elapsed = time.perf_counter() - started
+    peak = await sampler.stop()
+    after = platforms.stats()
+
+    traffic = {
+        platform: {key: after[platform][key] - before[platform].get(key, 0) for key in after[platform]}
+        for platform in after
+    }
+    succeeded = len(item_ids) - failed
+    return {
+        "items": len(item_ids),
+        "media_items": media_items,
+        "succeeded": succeeded,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "per_minute": round(succeeded / elapsed * 60, 2) if elapsed else None,
+        "latency_seconds": latency_summary(latencies),
+        "peak_rss_bytes": peak,
+        "bytes_uploaded": sum(counters.get("bytes_uploaded", 0) for counters in traffic.values()),
+        "bytes_downloaded": traffic["telegram"].get("bytes_downloaded", 0),
+        "requests": {platform: counters["requests"] for platform, counters in traffic.items()},
+    }
+
+async def run_benchmark(args, platforms: FakePlatforms, workdir: Path) -> Dict[str, dict]:
+    # Imported here: the settings are read from the environment set up in main
+    from app.db.database import Base, SessionLocal, engine
+    from app.api.models.post import Post
+    from app.api.models.story import Story
+    from app.api.models.job import PublicationJob  # noqa: F401 (table for create_all)
+    from app.api.models.checkpoint import PublicationCheckpoint  # noqa: F401 (table for create_all)
+    from app.utils.telegram_bot import close_bot
+    from app.workers.executor import shutdown_executors
+    from app.workers.render_pool import render_pool
+    from app.workers.instagram.publisher import publish_post_to_instagram
+    from app.workers.instagram.story_publisher import publish_story_to_instagram
+    from app.workers.telegram.publisher import publish_post_to_telegram
+    from app.workers.telegram.story_publisher import publish_story_to_telegram
+    from app.workers.vk.publisher import publish_post_to_vk
+    from app.workers.vk.story_publisher import publish_story_to_vk
+
+    Base.metadata.create_all(bind=engine)
+
+    publishers = {
+        "telegram_posts": publish_post_to_telegram,
+        "vk_posts": publish_post_to_vk,
+        "instagram_posts": publish_post_to_instagram,
+        "telegram_stories": publish_story_to_telegram,
+        "vk_stories": publish_story_to_vk,
+        "instagram_stories": publish_story_to_instagram,
+    }
+
+    def create_items(scenario: str) -> Tuple[List[str], int]:
+        """Create the scenario's posts (or stories with their posts), returning ids and media count."""
+        rng = random.Random(f"{args.seed}-{scenario}")
+        run_id = uuid.uuid4().hex[:8]
+        is_story = scenario.endswith("_stories")
+        ids, media_items = [], 0
+
+        db = SessionLocal()
+        try:
+            for index in range(args.posts):
+                text, photos, videos = synthetic_post(rng, run_id, index, args.max_media, args.video_share)
+                if is_story or scenario == "instagram_posts":
+                    # Stories need a photo; Instagram videos need a real video file, which the fake doesn't serve
+                    photos = photos or [f"{run_id}-{index}-photo0"]
+                    videos = []
+                post = Post(
+                    text=text,
+                    photos=photos,
+                    videos=videos,
+                    name=f"benchmark {index}",
+                    # An absolute storage path keeps the media out of MEDIA_DIR
+                    storage_path=str(workdir / "posts" / f"{scenario}-{index}")
+                )
+                db.add(post)
+                db.flush()
+
+                if is_story:
+                    story = Story(
+                        post_id=post.id,
+                        platform=scenario.split("_")[0],
+                        model_name=f"Модель {index}",
+                        price=f"{rng.randint(10, 300) * 100} руб.",
+                        media_file_id=photos[0]
+                    )
+                    db.add(story)
+                    db.flush()
+                    ids.append(story.id)
+                    media_items += 1
+                else:
+                    ids.append(post.id)
+                    media_items += len(photos) + len(videos)
+            db.commit()
+        finally:
+            db.close()
+        return ids, media_items
+
+    results = {}
+    try:
+        for scenario in args.scenarios.split(","):
+            scenario = scenario.strip()
+            if scenario not in publishers:
+                raise SystemExit(f"Unknown scenario {scenario}, expected one of: {', '.join(SCENARIOS)}")
+
+            ids, media_items = create_items(scenario)
+            print(f"Running {scenario}: {len(ids)} items, {media_items} media files", flush=True)
+            results[scenario] = await run_scenario(
+                scenario, publishers[scenario], ids, media_items, args.concurrency, platforms
+            )
+    finally:
+        await close_bot()
+        shutdown_executors()
+        render_pool.shutdown()
+    return results
+
+def print_summary(results: Dict[str, dict]):
+    print(f"\n{'scenario':<20}{'ok':>8}{'per min':>10}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'RSS MB':>9}{'up MB':>9}{'down MB':>9}")
+    for scenario, result in results.items():
+        latency = result["latency_seconds"]
+        print(
+            f"{scenario:<20}{result['succeeded']:>4}/{result['items']:<3}{result['per_minute'] or 0:>10.1f}"
+            f"{latency['p50'] or 0:>9.2f}{latency['p95'] or 0:>9.2f}{latency['p99'] or 0:>9.2f}"
+            f"{result['peak_rss_bytes'] / 2 ** 20:>9.1f}{result['bytes_uploaded'] / 2 ** 20:>9.1f}"
+            f"{result['bytes_downloaded'] / 2 ** 20:>9.1f}"
+        )
+
+async def main_async(args):
+    width, height = (int(value) for value in args.photo_size.lower().split("x"))
+    faults = {
+        platform: Faults(args.latency, args.jitter, args.error_rate, args.rate_limit_rate)
+        for platform in DEFAULT_PORTS
+    }
+    platforms = FakePlatforms(
+        ports={platform: getattr(args, f"{platform}_port") for platform in DEFAULT_PORTS},
+        faults=faults,
+        photo_size=(width, height),
+        video_bytes=int(args.video_mb * 1024 * 1024)
+    )
+
+    workdir = Path(tempfile.mkdtemp(prefix="tg_poster_benchmark_"))
+    await platforms.start()
+    try:
+        configure_environment(args, workdir, platforms.urls)
+        started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        scenarios = await run_benchmark(args, platforms, workdir)
+    finally:
+        await platforms.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "verbose")}
+    return {
+        "benchmark": "publish",
+        "started_at": started_at,
+        "environment": environment(),
+        "config": config,
+        "peak_rss_bytes": peak_rss(),
+        "scenarios": scenarios,
+    }
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    results = asyncio.run(main_async(args))
+    print_summary(results["scenarios"])
+    path = save_results("publish", results, args.output)
+    print(f"\nResults saved to {path}")
+
+if __name__ == "__main__":
+    main()
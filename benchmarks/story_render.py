@@ -0,0 +1,168 @@
+import argparse
+import io
+import multiprocessing
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageStat
+
+from benchmarks.common import current_rss, environment, peak_rss, reset_peak_rss, save_results
+
+# Story rendering micro-benchmark: CPU time and peak memory per story for
+# app.utils.story_image against the previous implementation (decode the
+# full photo, crop, resize, draw the text five times), kept below as
+# legacy_render. Each variant runs in a fresh process so peak RSS is its own.
+#
+#     python -m benchmarks.story_render --sizes 1280x960,4000x3000
+
+VARIANTS = ["legacy", "current"]
+
+
+def legacy_font(size: int) -> ImageFont.ImageFont:
+    """Font lookup as it was: probe Arial paths on every render."""
+    for path in ["arial.ttf", "/System/Library/Fonts/Supplemental/Arial.ttf"]:
+        try:
+            return ImageFont.truetype(path, size)
+        except IOError:
+            continue
+    return ImageFont.load_default()
+
+def legacy_render(image_data: bytes, model_name: Optional[str], price: Optional[str], template: str) -> bytes:
+    """Story rendering as it was before draft decoding, cached overlays and the font registry."""
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    width, height = image.size
+    target_ratio = 9 / 16
+    current_ratio = width / height
+    if current_ratio > target_ratio:
+        new_width = int(height * target_ratio)
+        left = (width - new_width) // 2
+        image = image.crop((left, 0, left + new_width, height))
+    elif current_ratio < target_ratio:
+        new_height = int(width / target_ratio)
+        top = (height - new_height) // 2
+        image = image.crop((0, top, width, top + new_height))
+    image = image.resize((1080, 1920))
+
+    draw = ImageDraw.Draw(image)
+    if template == "caption":
+        text = f"{model_name} - {price}"
+        font = legacy_font(80)
+        for offset_x, offset_y in [(-2, -2), (-2, 2), (2, -2), (2, 2)]:
+            draw.text((540 + offset_x, 1800 + offset_y), text, font=font, fill=(0, 0, 0), anchor="ms")
+        draw.text((540, 1800), text, font=font, fill=(255, 255, 255), anchor="ms")
+    else:
+        font = legacy_font(60)
+        text_x = (1080 - draw.textlength(model_name, font=font)) // 2
+        draw.rectangle([(0, 100), (1080, 200)], fill=(0, 0, 0, 128))
+        draw.text((text_x, 120), model_name, font=font, fill=(255, 255, 255))
+        text = f"Цена: {price}"
+        font = legacy_font(48)
+        text_x = (1080 - draw.textlength(text, font=font)) // 2
+        draw.rectangle([(0, 1720), (1080, 1820)], fill=(0, 0, 0, 128))
+        draw.text((text_x, 1740), text, font=font, fill=(255, 255, 255))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def run_variant(variant: str, image_data: bytes, renders: int, template: str) -> dict:
+    """Render the same story repeatedly in this (fresh) process and measure it."""
+    from app.utils.story_image import init_worker, render_story_image
+    from app.config.settings import STORY_FONT_PATHS
+
+    init_worker(STORY_FONT_PATHS)
+    render = legacy_render if variant == "legacy" else render_story_image
+    reset_peak_rss()
+    rss_before = current_rss()
+
+    output = b""
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for i in range(renders):
+        # Vary the price like real stories do; the model name repeats
+        output = render(image_data, "Nike Air Max 90", f"{9900 + i} руб.", template)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+
+    peak = peak_rss()
+    return {
+        "cpu_ms_per_story": round(cpu / renders * 1000, 1),
+        "wall_ms_per_story": round(wall / renders * 1000, 1),
+        "peak_rss_increase_bytes": max(peak - rss_before, 0),
+        "output": output,
+    }
+
+def photo_jpeg(width: int, height: int) -> bytes:
+    """Photo-like JPEG: smooth shapes with fine grain, unlike pure noise."""
+    shapes = Image.effect_noise((max(width // 32, 1), max(height // 32, 1)), 100).resize((width, height), Image.Resampling.BICUBIC)
+    grain = Image.effect_noise((width, height), 20)
+    channels = [ImageChops.add(shapes.point(lambda value, shift=shift: (value + shift) % 256), grain, 1, -128) for shift in (0, 40, 80)]
+    buffer = io.BytesIO()
+    Image.merge("RGB", channels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def mean_difference(first: bytes, second: bytes) -> float:
+    """Mean absolute per-channel difference of two images, 0-255."""
+    difference = ImageChops.difference(Image.open(io.BytesIO(first)).convert("RGB"), Image.open(io.BytesIO(second)).convert("RGB"))
+    return round(sum(ImageStat.Stat(difference).mean) / 3, 2)
+
+def benchmark_size(size: Tuple[int, int], renders: int, template: str) -> dict:
+    image_data = photo_jpeg(*size)
+    context = multiprocessing.get_context("spawn")
+
+    results: Dict[str, dict] = {}
+    for variant in VARIANTS:
+        with context.Pool(1) as pool:
+            results[variant] = pool.apply(run_variant, (variant, image_data, renders, template))
+
+    legacy, current = results["legacy"], results["current"]
+    return {
+        "source_bytes": len(image_data),
+        **{variant: {key: value for key, value in result.items() if key != "output"} for variant, result in results.items()},
+        "cpu_speedup": round(legacy["cpu_ms_per_story"] / current["cpu_ms_per_story"], 2) if current["cpu_ms_per_story"] else None,
+        "memory_ratio": round(legacy["peak_rss_increase_bytes"] / current["peak_rss_increase_bytes"], 2) if current["peak_rss_increase_bytes"] else None,
+        "mean_pixel_difference": mean_difference(legacy["output"], current["output"]),
+    }
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark story image rendering")
+    parser.add_argument("--sizes", default="1280x960,960x1280,2560x1920,1920x2560,4000x3000,3000x4000", help="Comma-separated source photo sizes, WIDTHxHEIGHT")
+    parser.add_argument("--renders", type=int, default=10, help="Stories rendered per variant and size")
+    parser.add_argument("--template", default="caption", choices=["caption", "banners"])
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/story_render-<time>.json)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sizes: List[Tuple[int, int]] = [parse_size(value) for value in args.sizes.split(",")]
+
+    results = {}
+    print(f"{'source':<12}{'legacy ms':>11}{'current ms':>12}{'speedup':>9}{'legacy MB':>11}{'current MB':>12}{'diff':>7}")
+    for size in sizes:
+        name = f"{size[0]}x{size[1]}"
+        result = results[name] = benchmark_size(size, args.renders, args.template)
+        legacy, current = result["legacy"], result["current"]
+        print(
+            f"{name:<12}{legacy['cpu_ms_per_story']:>11.1f}{current['cpu_ms_per_story']:>12.1f}{result['cpu_speedup'] or 0:>8.1f}x"
+            f"{legacy['peak_rss_increase_bytes'] / 2 ** 20:>11.1f}{current['peak_rss_increase_bytes'] / 2 ** 20:>12.1f}"
+            f"{result['mean_pixel_difference']:>7.2f}",
+            flush=True
+        )
+
+    path = save_results("story_render", {
+        "benchmark": "story_render",
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "config": {"renders": args.renders, "template": args.template},
+        "sizes": results,
+    }, args.output)
+    print(f"\nResults saved to {path}")
+
+if __name__ == "__main__":
+    main()
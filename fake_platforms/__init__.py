@@ -0,0 +1 @@
+# Local stand-ins for the Telegram Bot API, VK API and Instagram, for benchmarks and profiling
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import logging
+
+from fake_platforms.common import Faults
+from fake_platforms.instagram import write_session
+from fake_platforms.server import DEFAULT_PORTS, FakePlatforms
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run fake Telegram, VK and Instagram servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    for platform, port in DEFAULT_PORTS.items():
+        parser.add_argument(f"--{platform}-port", type=int, default=port)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a server error")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with a rate-limit error")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-after sent with rate-limit errors, seconds")
+    parser.add_argument("--instagram-session", help="Write an Instagram session for the fake user to this path and exit")
+    return parser.parse_args()
+
+async def serve(args):
+    def faults():
+        return Faults(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.retry_after)
+
+    platforms = FakePlatforms(
+        args.host,
+        ports={platform: getattr(args, f"{platform}_port") for platform in DEFAULT_PORTS},
+        faults={platform: faults() for platform in DEFAULT_PORTS}
+    )
+    await platforms.start()
+    for platform, url in platforms.urls.items():
+        print(f"{platform.upper()}_API_URL={url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await platforms.stop()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    args = parse_args()
+    if args.instagram_session:
+        write_session(args.instagram_session)
+        print(f"INSTAGRAM_SESSION_PATH={args.instagram_session}")
+        return
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
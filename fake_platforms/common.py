@@ -0,0 +1,133 @@
+import asyncio
+import io
+import logging
+import random
+from typing import Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class Faults:
+    """Latency and failure injection for one fake server.
+
+    Every request waits latency (plus up to jitter) seconds, then fails
+    with a rate-limit response with probability rate_limit_rate or with a
+    server error with probability error_rate.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    async def delay(self):
+        """Wait the configured latency."""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pick(self) -> Optional[str]:
+        """Decide whether the current request fails: "rate_limit", "error" or None."""
+        self.requests += 1
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.rate_limited += 1
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors += 1
+            return "error"
+        return None
+
+    def stats(self) -> dict:
+        """Return request counters."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def create_app(
+    faults: Faults,
+    error_response: Callable[[], web.Response],
+    rate_limit_response: Callable[[int], web.Response]
+) -> web.Application:
+    """Create an aiohttp app that applies faults to every request except /_stats."""
+
+    @web.middleware
+    async def inject_faults(request: web.Request, handler):
+        if request.path == "/_stats":
+            return await handler(request)
+
+        await faults.delay()
+        outcome = faults.pick()
+        if outcome == "rate_limit":
+            return rate_limit_response(faults.retry_after)
+        if outcome == "error":
+            return error_response()
+        return await handler(request)
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({**faults.stats(), **request.app.get("counters", {})})
+
+    app = web.Application(middlewares=[inject_faults], client_max_size=1024 ** 3)
+    app["faults"] = faults
+    app.router.add_get("/_stats", stats)
+    return app
+
+def origin(request: web.Request) -> str:
+    """Base URL the client used to reach the server, for URLs handed back to it."""
+    return f"{request.scheme}://{request.host}"
+
+def make_jpeg(width: int = 1280, height: int = 960, seed: int = 0) -> bytes:
+    """Generate a noisy JPEG that compresses like a photo rather than a flat image."""
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    image = Image.merge("RGB", [
+        channel.point(lambda value, shift=rng.randint(0, 128): (value + shift) % 256)
+        for channel in image.split()
+    ])
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+async def read_form(request: web.Request) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """Read a form or multipart body as ({field: value}, {file field: size in bytes}).
+
+    Uploaded files are drained and counted instead of kept in memory.
+    """
+    if not request.content_type.startswith("multipart/"):
+        form = await request.post()
+        return {key: str(value) for key, value in form.items()}, {}
+
+    fields, files = {}, {}
+    reader = await request.multipart()
+    async for part in reader:
+        if part.filename is None:
+            fields[part.name] = await part.text()
+            continue
+
+        size = 0
+        while True:
+            chunk = await part.read_chunk()
+            if not chunk:
+                break
+            size += len(chunk)
+        files[part.name] = size
+    return fields, files
@@ -0,0 +1,98 @@
+import json
+import time
+from typing import Optional
+
+from aiohttp import web
+from instagrapi import Client
+
+from fake_platforms.common import Faults, create_app
+
+# Instagram private API stand-in for the upload endpoints instagrapi uses
+# (rupload, media/configure*, user feed). Login is not emulated: publishers
+# use a saved session, see write_session.
+
+FAKE_USER_ID = "1"
+FAKE_USERNAME = "fake_user"
+
+
+class FakeInstagram:
+    def __init__(self):
+        self.next_pk = 3000000000000000000
+        self.counters = {"uploads": 0, "bytes_uploaded": 0, "configured": 0}
+
+    def _media(self, media_type: int, caption: str = "", children: Optional[list] = None) -> dict:
+        self.next_pk += 1
+        media = {
+            "pk": str(self.next_pk),
+            "id": f"{self.next_pk}_{FAKE_USER_ID}",
+            "code": f"F{self.next_pk % 10 ** 10}",
+            "taken_at": int(time.time()),
+            "media_type": media_type,
+            "product_type": "feed" if media_type != 2 else "clips",
+            "user": {"pk": FAKE_USER_ID, "username": FAKE_USERNAME, "full_name": "", "profile_pic_url": "https://example.com/p.jpg"},
+            "caption": {"text": caption} if caption else None,
+            "image_versions2": {"candidates": [{"url": "https://example.com/m.jpg", "width": 1080, "height": 1080}]},
+            "like_count": 0,
+            "comment_count": 0,
+        }
+        if children is not None:
+            media["carousel_media"] = children
+        return media
+
+    async def rupload(self, request: web.Request) -> web.Response:
+        size = 0
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+        self.counters["uploads"] += 1
+        self.counters["bytes_uploaded"] += size
+
+        params = json.loads(request.headers.get("X-Instagram-Rupload-Params", "{}"))
+        return web.json_response({"upload_id": params.get("upload_id", str(time.time_ns())), "xsharing_nonces": {}, "status": "ok"})
+
+    async def api(self, request: web.Request) -> web.Response:
+        path = request.match_info["path"].strip("/")
+        form = await request.post()
+        data = json.loads(form["signed_body"].split(".", 1)[1]) if "signed_body" in form else dict(form)
+
+        if path in ("media/configure", "media/configure_to_story", "media/configure_to_clips"):
+            self.counters["configured"] += 1
+            media_type = 2 if "clips" in path or data.get("clips") else 1
+            return web.json_response({"media": self._media(media_type, data.get("caption", "")), "status": "ok"})
+        if path == "media/configure_sidecar":
+            self.counters["configured"] += 1
+            children = [self._media(1) for _ in data.get("children_metadata", [])]
+            return web.json_response({"media": self._media(8, data.get("caption", ""), children), "status": "ok"})
+        if path.startswith("feed/user/"):
+            return web.json_response({"items": [], "num_results": 0, "more_available": False, "status": "ok"})
+        return web.json_response({"status": "ok"})
+
+
+def create_instagram_app(faults: Faults) -> web.Application:
+    """Create the fake Instagram server (use its URL as INSTAGRAM_API_URL)."""
+    instagram = FakeInstagram()
+    app = create_app(
+        faults,
+        error_response=lambda: web.json_response({"message": "Internal Server Error", "status": "fail"}, status=500),
+        rate_limit_response=lambda retry_after: web.json_response(
+            {"message": "Please wait a few minutes before you try again.", "status": "fail"},
+            status=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+    )
+    app["counters"] = instagram.counters
+    app.router.add_post("/rupload_igphoto/{name}", instagram.rupload)
+    app.router.add_post("/rupload_igvideo/{name}", instagram.rupload)
+    app.router.add_route("*", "/api/v1/{path:.+}", instagram.api)
+    return app
+
+def write_session(path: str):
+    """Write an instagrapi session for the fake user, so publishers skip the login flow."""
+    client = Client()
+    settings = client.get_settings()
+    settings["authorization_data"] = {
+        "ds_user_id": FAKE_USER_ID,
+        "sessionid": f"{FAKE_USER_ID}%3Afake%3A1",
+        "should_use_header_over_cookies": True,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
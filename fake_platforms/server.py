@@ -0,0 +1,63 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from fake_platforms.common import Faults
+from fake_platforms.instagram import create_instagram_app
+from fake_platforms.telegram import create_telegram_app
+from fake_platforms.vk import create_vk_app
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"telegram": 8091, "vk": 8092, "instagram": 8093}
+
+
+class FakePlatforms:
+    """Runs the fake platform servers on the current event loop.
+
+    Settings to point the app at them: TELEGRAM_API_URL, VK_API_URL and
+    INSTAGRAM_API_URL set to urls["telegram"], urls["vk"] and
+    urls["instagram"]. Telegram serves one photo of photo_size pixels and
+    one video of video_bytes for every file id. Each server reports its
+    counters at /_stats.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        ports: Optional[Dict[str, int]] = None,
+        faults: Optional[Dict[str, Faults]] = None,
+        photo_size: Tuple[int, int] = (1280, 960),
+        video_bytes: int = 2 * 1024 * 1024
+    ):
+        self.host = host
+        self.ports = {**DEFAULT_PORTS, **(ports or {})}
+        self.faults = {platform: (faults or {}).get(platform) or Faults() for platform in DEFAULT_PORTS}
+        self.apps = {
+            "telegram": create_telegram_app(self.faults["telegram"], photo_size, video_bytes),
+            "vk": create_vk_app(self.faults["vk"]),
+            "instagram": create_instagram_app(self.faults["instagram"]),
+        }
+        self._runners: List[web.AppRunner] = []
+
+    @property
+    def urls(self) -> Dict[str, str]:
+        return {platform: f"http://{self.host}:{port}" for platform, port in self.ports.items()}
+
+    def stats(self) -> dict:
+        """Return request and fault counters of every server."""
+        return {platform: {**self.faults[platform].stats(), **app["counters"]} for platform, app in self.apps.items()}
+
+    async def start(self):
+        for platform, app in self.apps.items():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.ports[platform]).start()
+            self._runners.append(runner)
+            logger.info(f"Fake {platform} listening on {self.urls[platform]}")
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+import zlib
+from typing import Dict
+
+from aiohttp import web
+
+from fake_platforms.common import Faults, create_app, make_jpeg, read_form
+
+# Bot API stand-in for the methods the bot and publishers use. File ids
+# containing "video" resolve to video files, everything else to photos.
+
+def _error(code: int, description: str, **parameters) -> web.Response:
+    body = {"ok": False, "error_code": code, "description": description}
+    if parameters:
+        body["parameters"] = parameters
+    return web.json_response(body, status=code)
+
+def _chat_id(value: str) -> int:
+    """Numeric id for a chat given as a number or @username."""
+    try:
+        return int(value)
+    except ValueError:
+        return -1000000000000 - zlib.crc32(value.encode("utf-8"))
+
+
+class FakeTelegram:
+    def __init__(self, photo: bytes, video: bytes):
+        self.photo = photo
+        self.video = video
+        self.message_ids: Dict[int, int] = {}
+        self.counters = {"messages": 0, "media_groups": 0, "files_downloaded": 0, "bytes_downloaded": 0, "bytes_uploaded": 0}
+
+    def _message(self, chat_id: int, **fields) -> dict:
+        self.message_ids[chat_id] = self.message_ids.get(chat_id, 0) + 1
+        self.counters["messages"] += 1
+        return {
+            "message_id": self.message_ids[chat_id],
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "channel" if chat_id < 0 else "private"},
+            **fields
+        }
+
+    async def method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        fields, files = await read_form(request)
+        self.counters["bytes_uploaded"] += sum(files.values())
+        chat_id = _chat_id(fields.get("chat_id", "0"))
+
+        if method == "getfile":
+            file_id = fields.get("file_id", "")
+            is_video = "video" in file_id
+            result = {
+                "file_id": file_id,
+                "file_unique_id": f"u{zlib.crc32(file_id.encode('utf-8'))}",
+                "file_size": len(self.video if is_video else self.photo),
+                "file_path": f"{'videos' if is_video else 'photos'}/{file_id}.{'mp4' if is_video else 'jpg'}"
+            }
+        elif method == "sendmediagroup":
+            media = json.loads(fields.get("media", "[]"))
+            if not 2 <= len(media) <= 10:
+                return _error(400, "Bad Request: wrong number of media in the group")
+            self.counters["media_groups"] += 1
+            group_id = str(time.time_ns())
+            result = [self._message(chat_id, media_group_id=group_id) for _ in media]
+        elif method in ("sendphoto", "sendvideo", "senddocument"):
+            result = self._message(chat_id, caption=fields.get("caption"))
+        elif method == "sendmessage":
+            result = self._message(chat_id, text=fields.get("text", ""))
+        elif method == "getme":
+            result = {"id": 1, "is_bot": True, "first_name": "Fake bot", "username": "fake_bot"}
+        else:
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def file(self, request: web.Request) -> web.Response:
+        is_video = request.match_info["path"].startswith("videos/")
+        body = self.video if is_video else self.photo
+        self.counters["files_downloaded"] += 1
+        self.counters["bytes_downloaded"] += len(body)
+        return web.Response(
+            body=body,
+            content_type="video/mp4" if is_video else "image/jpeg"
+        )
+
+
+def create_telegram_app(faults: Faults, photo_size=(1280, 960), video_bytes: int = 2 * 1024 * 1024) -> web.Application:
+    """Create the fake Bot API server (use its URL as TELEGRAM_API_URL)."""
+    telegram = FakeTelegram(make_jpeg(*photo_size), os.urandom(video_bytes))
+    app = create_app(
+        faults,
+        error_response=lambda: _error(500, "Internal Server Error"),
+        rate_limit_response=lambda retry_after: _error(
+            429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after
+        )
+    )
+    app["counters"] = telegram.counters
+    app.router.add_route("*", "/bot{token}/{method}", telegram.method)
+    app.router.add_get("/file/bot{token}/{path:.+}", telegram.file)
+    return app
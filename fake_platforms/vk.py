@@ -0,0 +1,194 @@
+import json
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from aiohttp import web
+
+from fake_platforms.common import Faults, create_app, origin, read_form
+
+# VK API stand-in for the methods the publishers use. execute understands
+# the scripts generated by vk_api's VkRequestsPool and app.workers.vk.batch,
+# not VKScript in general.
+
+_decoder = json.JSONDecoder()
+_call_pattern = re.compile(r"API\.([\w.]+)\(")
+
+
+class VkError(Exception):
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+
+def _error(code: int, message: str, method: str = "", params: dict = None) -> dict:
+    return {
+        "error_code": code,
+        "error_msg": message,
+        "method": method,
+        "request_params": [{"key": key, "value": str(value)} for key, value in (params or {}).items()],
+    }
+
+def _api_calls(code: str) -> List[Tuple[str, Any, int, int]]:
+    """Find API.method(argument) calls as (method, JSON argument or None, start, end)."""
+    calls = []
+    for match in _call_pattern.finditer(code):
+        try:
+            argument, end = _decoder.raw_decode(code, match.end())
+        except ValueError:
+            argument, end = None, match.end()
+        calls.append((match.group(1), argument, match.start(), end))
+    return calls
+
+
+class FakeVk:
+    def __init__(self):
+        self.next_id = 1000
+        self.posts_by_guid: Dict[str, int] = {}
+        self.stories: List[dict] = []
+        self.counters = {"api_calls": 0, "executes": 0, "wall_posts": 0, "photos_saved": 0, "files_uploaded": 0, "bytes_uploaded": 0}
+
+    def _id(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def call(self, base: str, method: str, params: dict) -> Any:
+        """Run one API method and return its response, raising VkError on failure."""
+        self.counters["api_calls"] += 1
+        owner_id = -abs(int(params.get("group_id") or params.get("owner_id") or 1))
+
+        if method == "photos.getWallUploadServer":
+            return {"upload_url": f"{base}/upload/wall", "album_id": -14, "user_id": 0}
+        if method == "photos.saveWallPhoto":
+            photos = json.loads(params.get("photo") or "[]")
+            if not photos:
+                raise VkError(100, "One of the parameters specified was missing or invalid: photo is undefined")
+            self.counters["photos_saved"] += len(photos)
+            return [{"id": self._id(), "owner_id": owner_id, "album_id": -14, "date": int(time.time()), "sizes": []} for _ in photos]
+        if method == "video.save":
+            return {
+                "upload_url": f"{base}/upload/video",
+                "video_id": self._id(),
+                "owner_id": owner_id,
+                "title": params.get("name", ""),
+                "access_key": "fake"
+            }
+        if method == "wall.post":
+            # VK returns the same post for a repeated guid
+            guid = params.get("guid")
+            if guid and guid in self.posts_by_guid:
+                return {"post_id": self.posts_by_guid[guid]}
+            post_id = self._id()
+            if guid:
+                self.posts_by_guid[guid] = post_id
+            self.counters["wall_posts"] += 1
+            return {"post_id": post_id}
+        if method == "stories.getPhotoUploadServer":
+            return {"upload_url": f"{base}/upload/story", "user_ids": []}
+        if method == "stories.save":
+            story = {"id": self._id(), "owner_id": owner_id, "date": int(time.time())}
+            self.stories.append(story)
+            return {"count": 1, "items": [story]}
+        if method == "stories.get":
+            items = [story for story in self.stories if story["owner_id"] == owner_id]
+            return {"count": len(items), "items": [{"type": "community", "stories": items}] if items else []}
+        raise VkError(3, "Unknown method passed")
+
+    def _try_call(self, base: str, method: str, params: dict, errors: list) -> Any:
+        try:
+            return self.call(base, method, params)
+        except VkError as e:
+            errors.append(_error(e.code, e.message, method))
+            return False
+
+    def execute(self, base: str, code: str) -> dict:
+        """Run a supported execute script, returning the raw response with execute_errors."""
+        self.counters["executes"] += 1
+        errors = []
+        calls = _api_calls(code)
+        if not calls or len(calls) > 25:
+            raise VkError(13, "Runtime error occurred during code invocation: unsupported script")
+
+        if "result.push(API." in code:
+            # VkRequestsPool, one method: var values = [...], ... API.method(values[i])
+            values, _ = _decoder.raw_decode(code, code.index("[", code.index("var values")))
+            response = [self._try_call(base, calls[0][0], params, errors) for params in values]
+        elif code.startswith("return ["):
+            # VkRequestsPool, several methods: return [API.a({...}), API.b({...})];
+            response = [self._try_call(base, method, params or {}, errors) for method, params, _, _ in calls]
+        elif "API.wall.post(" in code:
+            response = self._execute_wall_post(base, code, errors)
+        elif "API.stories.save(" in code:
+            results = [self._try_call(base, method, params or {}, errors) for method, params, _, _ in calls]
+            response = {"save": results[0], "stories": results[1] if len(results) > 1 else False}
+        else:
+            raise VkError(13, "Runtime error occurred during code invocation: unsupported script")
+
+        raw = {"response": response}
+        if errors:
+            raw["execute_errors"] = errors
+        return raw
+
+    def _execute_wall_post(self, base: str, code: str, errors: list) -> dict:
+        """Script of app.workers.vk.batch.save_photos_and_post."""
+        attachments, saved = [], []
+        for line in code.splitlines():
+            if "API.photos.saveWallPhoto(" in line:
+                _, params, _, _ = _api_calls(line)[0]
+                photos = self._try_call(base, "photos.saveWallPhoto", params, errors) or []
+                saved.append(",".join(f"photo{photo['owner_id']}_{photo['id']}" for photo in photos))
+            elif line.startswith("saved.push(s)"):
+                if saved[-1]:
+                    attachments.append(saved[-1])
+            elif line.startswith("att = att + sep + "):
+                value, _ = _decoder.raw_decode(line, len("att = att + sep + "))
+                attachments.append(value)
+            elif "API.wall.post(" in line:
+                start = line.index("API.wall.post(") + len("API.wall.post(")
+                params, _ = _decoder.raw_decode(line.replace(', "attachments": att}', "}"), start)
+                params["attachments"] = ",".join(attachments)
+                post = self._try_call(base, "wall.post", params, errors)
+        return {"post": post, "saved": saved}
+
+    async def method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params, _ = await read_form(request)
+        params = {**request.query, **params}
+        base = origin(request)
+
+        try:
+            if method == "execute":
+                return web.json_response(self.execute(base, params.get("code", "")))
+            return web.json_response({"response": self.call(base, method, params)})
+        except VkError as e:
+            return web.json_response({"error": _error(e.code, e.message, method, params)})
+
+    async def upload(self, request: web.Request) -> web.Response:
+        kind = request.match_info["kind"]
+        _, files = await read_form(request)
+        self.counters["files_uploaded"] += len(files)
+        self.counters["bytes_uploaded"] += sum(files.values())
+
+        if kind == "wall":
+            photos = [{"photo": f"fake{self._id()}", "sizes": [], "kid": "fake"} for _ in files]
+            return web.json_response({"server": 1, "photo": json.dumps(photos), "hash": "fakehash"})
+        if kind == "video":
+            return web.json_response({"size": sum(files.values()), "video_id": self._id(), "video_hash": "fakehash"})
+        return web.json_response({"upload_result": f"fake{self._id()}"})
+
+
+def create_vk_app(faults: Faults) -> web.Application:
+    """Create the fake VK API server (use its URL as VK_API_URL)."""
+    vk = FakeVk()
+    app = create_app(
+        faults,
+        error_response=lambda: web.json_response({"error": "Service Unavailable"}, status=503),
+        rate_limit_response=lambda retry_after: web.json_response(
+            {"error": _error(6, "Too many requests per second")}
+        )
+    )
+    app["counters"] = vk.counters
+    app.router.add_post("/method/{method}", vk.method)
+    app.router.add_post("/upload/{kind}", vk.upload)
+    return app
@@ -20,7 +20,7 @@ apt upgrade -y
 
 # Install dependencies
 echo "Installing dependencies..."
-apt install -y python3-pip python3-venv nginx supervisor
+apt install -y python3-pip python3-venv nginx supervisor fonts-liberation fonts-dejavu-core
 
 # Create virtual environment
 echo "Creating virtual environment..."
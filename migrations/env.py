@@ -24,6 +24,8 @@ fileConfig(config.config_file_name)
 # target_metadata = mymodel.Base.metadata
 from app.db.database import Base
 from app.api.models.post import Post, PublicationLog
+from app.api.models.job import PublicationJob
+from app.api.models.checkpoint import PublicationCheckpoint
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -27,7 +27,7 @@ apt upgrade -y
 
 # Установка необходимых пакетов
 echo "Установка необходимых пакетов..."
-apt install -y python3 python3-pip python3-venv postgresql postgresql-contrib nginx supervisor git
+apt install -y python3 python3-pip python3-venv postgresql postgresql-contrib nginx supervisor fonts-liberation fonts-dejavu-core git
 
 # Создание директории проекта
 echo "Создание директории проекта..."
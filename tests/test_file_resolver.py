@@ -0,0 +1,71 @@
+import asyncio
+
+from app.utils.file_resolver import TelegramFileResolver
+
+
+class FakeResolver(TelegramFileResolver):
+    """Resolver whose getFile calls block until released."""
+
+    def __init__(self):
+        super().__init__(ttl=3600)
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def _get_file(self, file_id):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return f"file:{file_id}"
+
+
+def test_concurrent_lookups_share_one_request():
+    async def run():
+        resolver = FakeResolver()
+        callers = [asyncio.create_task(resolver.resolve("a")) for _ in range(3)]
+        await asyncio.sleep(0)
+        resolver.release.set()
+        assert await asyncio.gather(*callers) == ["file:a"] * 3
+        assert resolver.calls == 1
+        assert await resolver.resolve("a") == "file:a"
+        assert resolver.calls == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    async def run():
+        resolver = FakeResolver()
+        owner = asyncio.create_task(resolver.resolve("a"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(resolver.resolve("a"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        await asyncio.sleep(0)
+        resolver.release.set()
+
+        assert await waiter == "file:a"
+        assert owner.cancelled()
+        assert resolver.calls == 1
+
+    asyncio.run(run())
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    async def run():
+        resolver = FakeResolver()
+        resolver.error = ConnectionError("down")
+        callers = [asyncio.create_task(resolver.resolve("a")) for _ in range(2)]
+        await asyncio.sleep(0)
+        resolver.release.set()
+
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+        resolver.error = None
+        assert await resolver.resolve("a") == "file:a"
+        assert resolver.calls == 2
+
+    asyncio.run(run())